@@ -49,18 +49,14 @@ export default function HistoryDetailPage({ params }: PageProps) {
         setLoading(true)
         setError(null)
 
-        // Since FastAPI backend doesn't have individual summary endpoint,
-        // we fetch all summaries and find the one we need
-        const response = await fetch(getApiUrl(API_CONFIG.ENDPOINTS.HISTORY))
-        if (!response.ok) {
-          throw new Error("Failed to fetch summaries")
-        }
-        const data = await response.json()
-        const foundSummary = data.summaries.find((summary: Summary) => summary.id === id)
-        
-        if (!foundSummary) {
+        const response = await fetch(getApiUrl(`${API_CONFIG.ENDPOINTS.HISTORY}/${id}`))
+        if (response.status === 404) {
           throw new Error("Summary not found")
         }
+        if (!response.ok) {
+          throw new Error("Failed to fetch summary")
+        }
+        const foundSummary: Summary = await response.json()
         
         setSummary(foundSummary)
       } catch (err) {
@@ -20,6 +20,7 @@ interface Summary {
   title: string
   content: string
   transcript?: string
+  hasTranscript: boolean
   language: string
   mode: string
   source: string
@@ -29,13 +30,28 @@ interface Summary {
 
 interface HistoryResponse {
   summaries: Summary[]
-  total: number
 }
 
+// Number of summaries requested per page
+const PAGE_SIZE = 50
+
 export default function HistoryPage() {
   const [summaries, setSummaries] = useState<Summary[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [hasMore, setHasMore] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
+
+  const fetchHistoryPage = async (offset: number): Promise<Summary[]> => {
+    const response = await fetch(getApiUrl(`${API_CONFIG.ENDPOINTS.HISTORY}?limit=${PAGE_SIZE}&offset=${offset}`))
+    if (!response.ok) {
+      throw new Error("Failed to fetch history")
+    }
+    const data: HistoryResponse = await response.json()
+    const page = data.summaries || []
+    setHasMore(page.length === PAGE_SIZE)
+    return page
+  }
 
   useEffect(() => {
     const fetchHistory = async () => {
@@ -43,12 +59,7 @@ export default function HistoryPage() {
         setLoading(true)
         setError(null)
 
-        const response = await fetch(getApiUrl(API_CONFIG.ENDPOINTS.HISTORY))
-        if (!response.ok) {
-          throw new Error("Failed to fetch history")
-        }
-        const data: HistoryResponse = await response.json()
-        setSummaries(data.summaries || [])
+        setSummaries(await fetchHistoryPage(0))
       } catch (err) {
         setError(err instanceof Error ? err.message : "Failed to load history")
       } finally {
@@ -59,6 +70,18 @@ export default function HistoryPage() {
     fetchHistory()
   }, [])
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true)
+      const page = await fetchHistoryPage(summaries.length)
+      setSummaries(prev => [...prev, ...page])
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Failed to load history")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleDateString(undefined, {
       year: "numeric",
@@ -246,7 +269,7 @@ export default function HistoryPage() {
                       
                       <div className="flex items-center justify-between">
                         <div className="flex items-center gap-4 text-xs text-muted-foreground">
-                          {summary.transcript && (
+                          {summary.hasTranscript && (
                             <span className="flex items-center gap-1">
                               <MessageSquare className="h-3 w-3" />
                               Transcript available
@@ -263,6 +286,13 @@ export default function HistoryPage() {
                   </Card>
                 ))}
               </div>
+              {hasMore && (
+                <div className="flex justify-center mt-6">
+                  <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -92,6 +92,7 @@ export function ChatInterface({ summaryId, summaryTitle, onBack }: ChatInterface
     const userMessage = message.trim()
     setMessage("")
     setIsSending(true)
+    let pendingMessages = 0
 
     try {
       // Add user message to UI immediately
@@ -105,6 +106,7 @@ export function ChatInterface({ summaryId, summaryTitle, onBack }: ChatInterface
         ...prev,
         messages: [...prev.messages, tempUserMessage]
       } : null)
+      pendingMessages = 1
 
       // Send message to API
       const response = await apiRequest(API_CONFIG.ENDPOINTS.CHAT_MESSAGE, {
@@ -115,27 +117,73 @@ export function ChatInterface({ summaryId, summaryTitle, onBack }: ChatInterface
         })
       })
 
-      const chatResponse = await response.json()
-      
-      // Add AI response to UI
+      // Add an empty AI message and fill it in as the response streams
       setActiveConversation(prev => prev ? {
         ...prev,
-        messages: [...prev.messages, chatResponse.message]
+        messages: [...prev.messages, { role: 'assistant', content: '' }]
       } : null)
+      pendingMessages = 2
+
+      const updateAssistantMessage = (assistantMessage: ChatMessage) => {
+        setActiveConversation(prev => prev ? {
+          ...prev,
+          messages: [...prev.messages.slice(0, -1), assistantMessage]
+        } : null)
+      }
+
+      const reader = response.body?.getReader()
+      if (!reader) {
+        throw new Error('Failed to read response stream')
+      }
+
+      const decoder = new TextDecoder()
+      let buffered = ''
+      let streamedContent = ''
+      let finalMessage: ChatMessage | null = null
+
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+
+        buffered += decoder.decode(value, { stream: true })
+        const lines = buffered.split('\n')
+        buffered = lines.pop() ?? ''
+
+        for (const line of lines) {
+          if (!line.trim()) continue
+
+          const data = JSON.parse(line)
+          if (data.type === 'delta') {
+            streamedContent += data.content
+            updateAssistantMessage({ role: 'assistant', content: streamedContent })
+          } else if (data.type === 'complete') {
+            finalMessage = data.message
+          } else if (data.type === 'error') {
+            throw new Error(data.message)
+          }
+        }
+      }
+
+      if (!finalMessage) {
+        throw new Error('Response stream ended unexpectedly')
+      }
+
+      const assistantMessage: ChatMessage = finalMessage
+      updateAssistantMessage(assistantMessage)
 
       // Update conversations list
       setConversations(prev => prev.map(conv => 
         conv.id === activeConversation.id 
-          ? { ...conv, messages: [...conv.messages, tempUserMessage, chatResponse.message] }
+          ? { ...conv, messages: [...conv.messages, tempUserMessage, assistantMessage] }
           : conv
       ))
 
     } catch (error) {
       console.error('Failed to send message:', error)
-      // Remove the temporary user message on error
+      // Remove the temporary user and AI messages on error
       setActiveConversation(prev => prev ? {
         ...prev,
-        messages: prev.messages.slice(0, -1)
+        messages: prev.messages.slice(0, prev.messages.length - pendingMessages)
       } : null)
     } finally {
       setIsSending(false)
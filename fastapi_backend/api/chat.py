@@ -1,28 +1,43 @@
-import os
-import json
+import orjson
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, AsyncIterator
+from datetime import datetime, timedelta
 from fastapi import HTTPException
 from pydantic import BaseModel
 import google.generativeai as genai
-from dotenv import load_dotenv
+from google.generativeai import caching
 
-from lib.supabase_client import supabase
+from lib.gemini import GEMINI_API_KEY
+from lib.supabase_client import supabase, run_query
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini AI
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    logger.warning("GEMINI_API_KEY not found in environment variables")
+CHAT_MODEL = "gemini-2.0-flash-001"
+
+CHAT_SYSTEM_INSTRUCTION = """You are an AI assistant helping users understand and discuss a video they've watched. 
+You have access to the video's summary and transcript. Answer the user's question based on this information.
+Be helpful, accurate, and conversational. If the question cannot be answered from the provided context, 
+politely explain that and suggest what information might be needed."""
+
+VIDEO_CONTEXT_TEMPLATE = """
+Video Title: {title}
+Video Summary: {summary}
+Video Transcript: {transcript}
+"""
+
+# Shared model for conversations whose video context is not cached
+chat_model = genai.GenerativeModel(CHAT_MODEL, system_instruction=CHAT_SYSTEM_INSTRUCTION)
+
+# How long Gemini keeps a conversation's video context cached between messages
+CONTEXT_CACHE_TTL = timedelta(hours=1)
+
+# Gemini rejects caches below a minimum token count (~4 characters per token)
+MIN_CACHED_CONTEXT_CHARS = 4096 * 4
+
+# Columns read into ChatConversation / ChatMessage
+CONVERSATION_COLUMNS = "id, summary_id, title, created_at, updated_at"
+MESSAGE_COLUMNS = "role, content, created_at"
 
 class ChatMessage(BaseModel):
     role: str  # 'user' or 'assistant'
@@ -51,163 +66,169 @@ class ChatResponse(BaseModel):
 
 async def create_conversation(request: CreateConversationRequest) -> ChatConversation:
     """Create a new chat conversation for a summary"""
-    try:
-        # Verify the summary exists
-        summary_response = supabase.table("summaries").select("*").eq("id", request.summary_id).execute()
-        if not summary_response.data:
-            raise HTTPException(status_code=404, detail="Summary not found")
-        
-        # Create conversation
-        conversation_data = {
-            "summary_id": request.summary_id,
-            "title": request.title
-        }
-        
-        response = supabase.table("chat_conversations").insert(conversation_data).execute()
-        if not response.data:
-            raise HTTPException(status_code=500, detail="Failed to create conversation")
-        
-        conversation = response.data[0]
-        return ChatConversation(
-            id=conversation["id"],
-            summary_id=conversation["summary_id"],
-            title=conversation["title"],
-            created_at=conversation["created_at"],
-            updated_at=conversation["updated_at"],
-            messages=[]
-        )
-        
-    except Exception as e:
-        logger.error(f"Error creating conversation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to create conversation: {str(e)}")
+    # Verify the summary exists
+    summary_response = await run_query(supabase.table("summaries").select("id", count="exact", head=True).eq("id", request.summary_id))
+    if not summary_response.count:
+        raise HTTPException(status_code=404, detail="Summary not found")
+    
+    # Create conversation
+    conversation_data = {
+        "summary_id": request.summary_id,
+        "title": request.title
+    }
+    
+    response = await run_query(supabase.table("chat_conversations").insert(conversation_data))
+    if not response.data:
+        raise HTTPException(status_code=500, detail="Failed to create conversation")
+    
+    conversation = response.data[0]
+    return ChatConversation(
+        id=conversation["id"],
+        summary_id=conversation["summary_id"],
+        title=conversation["title"],
+        created_at=conversation["created_at"],
+        updated_at=conversation["updated_at"],
+        messages=[]
+    )
 
-async def get_conversations(summary_id: str) -> List[ChatConversation]:
-    """Get all conversations for a summary"""
-    try:
-        response = supabase.table("chat_conversations").select("*").eq("summary_id", summary_id).order("created_at", desc=True).execute()
-        
-        conversations = []
-        for conv_data in response.data:
-            # Get messages for this conversation
-            messages_response = supabase.table("chat_messages").select("*").eq("conversation_id", conv_data["id"]).order("created_at", desc=False).execute()
-            
-            messages = [
-                ChatMessage(
-                    role=msg["role"],
-                    content=msg["content"],
-                    created_at=msg["created_at"]
-                )
-                for msg in messages_response.data
-            ]
-            
-            conversations.append(ChatConversation(
-                id=conv_data["id"],
-                summary_id=conv_data["summary_id"],
-                title=conv_data["title"],
-                created_at=conv_data["created_at"],
-                updated_at=conv_data["updated_at"],
-                messages=messages
-            ))
-        
-        return conversations
-        
-    except Exception as e:
-        logger.error(f"Error getting conversations: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to get conversations: {str(e)}")
-
-async def get_conversation(conversation_id: str) -> ChatConversation:
-    """Get a specific conversation with its messages"""
-    try:
-        # Get conversation
-        conv_response = supabase.table("chat_conversations").select("*").eq("id", conversation_id).execute()
-        if not conv_response.data:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        conv_data = conv_response.data[0]
-        
-        # Get messages
-        messages_response = supabase.table("chat_messages").select("*").eq("conversation_id", conversation_id).order("created_at", desc=False).execute()
-        
-        messages = [
+def conversation_from_row(conv_data: Dict[str, Any]) -> ChatConversation:
+    """Build a ChatConversation from a chat_conversations row with embedded chat_messages"""
+    return ChatConversation(
+        id=conv_data["id"],
+        summary_id=conv_data["summary_id"],
+        title=conv_data["title"],
+        created_at=conv_data["created_at"],
+        updated_at=conv_data["updated_at"],
+        messages=[
             ChatMessage(
                 role=msg["role"],
                 content=msg["content"],
                 created_at=msg["created_at"]
             )
-            for msg in messages_response.data
+            for msg in conv_data.get("chat_messages") or []
         ]
-        
-        return ChatConversation(
-            id=conv_data["id"],
-            summary_id=conv_data["summary_id"],
-            title=conv_data["title"],
-            created_at=conv_data["created_at"],
-            updated_at=conv_data["updated_at"],
-            messages=messages
-        )
-        
-    except Exception as e:
-        logger.error(f"Error getting conversation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to get conversation: {str(e)}")
+    )
 
-async def send_message(request: SendMessageRequest) -> ChatResponse:
-    """Send a message and get AI response"""
-    try:
-        # Get conversation and verify it exists
-        conversation = await get_conversation(request.conversation_id)
-        
-        # Get the original summary for context
-        summary_response = supabase.table("summaries").select("*").eq("id", conversation.summary_id).execute()
-        if not summary_response.data:
-            raise HTTPException(status_code=404, detail="Summary not found")
-        
-        summary_data = summary_response.data[0]
-        
-        # Save user message
-        user_message_data = {
-            "conversation_id": request.conversation_id,
-            "role": "user",
-            "content": request.message
-        }
-        
-        user_msg_response = supabase.table("chat_messages").insert(user_message_data).execute()
-        if not user_msg_response.data:
-            raise HTTPException(status_code=500, detail="Failed to save user message")
-        
-        # Prepare context for AI
-        context = f"""
-Video Title: {summary_data['title']}
-Video Summary: {summary_data['summary']}
-Video Transcript: {summary_data.get('transcript', 'No transcript available')}
+async def get_conversations(summary_id: str) -> List[ChatConversation]:
+    """Get all conversations for a summary"""
+    # Embed messages in the same request instead of one query per conversation
+    response = await run_query(
+        supabase.table("chat_conversations")
+        .select(f"{CONVERSATION_COLUMNS}, chat_messages({MESSAGE_COLUMNS})")
+        .eq("summary_id", summary_id)
+        .order("created_at", desc=True)
+        .order("created_at", foreign_table="chat_messages")
+    )
+    
+    return [conversation_from_row(conv_data) for conv_data in response.data]
 
-Previous conversation:
-"""
-        
-        # Add previous messages to context
-        for msg in conversation.messages:
-            context += f"{msg.role.capitalize()}: {msg.content}\n"
-        
-        # Add current user message
-        context += f"User: {request.message}\n"
-        
-        # Generate AI response using Gemini
-        if not GEMINI_API_KEY:
-            raise HTTPException(status_code=500, detail="Gemini API key not configured")
-        
-        try:
-            model = genai.GenerativeModel('gemini-2.0-flash-001')
-            
-            prompt = f"""You are an AI assistant helping users understand and discuss a video they've watched. 
-You have access to the video's summary and transcript. Answer the user's question based on this information.
-Be helpful, accurate, and conversational. If the question cannot be answered from the provided context, 
-politely explain that and suggest what information might be needed.
+async def get_conversation(conversation_id: str) -> ChatConversation:
+    """Get a specific conversation with its messages"""
+    conv_response = await run_query(
+        supabase.table("chat_conversations")
+        .select(f"{CONVERSATION_COLUMNS}, chat_messages({MESSAGE_COLUMNS})")
+        .eq("id", conversation_id)
+        .order("created_at", foreign_table="chat_messages")
+    )
+    if not conv_response.data:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    return conversation_from_row(conv_response.data[0])
 
-{context}
+async def get_cached_context_model(conv_data: Dict[str, Any], video_context: str) -> Optional[genai.GenerativeModel]:
+    """Get a model bound to the conversation's cached video context, creating the cache if needed"""
+    if len(video_context) < MIN_CACHED_CONTEXT_CHARS:
+        return None
+    
+    cache_name = conv_data.get("context_cache_name")
+    if cache_name:
+        try:
+            cached_content = await asyncio.to_thread(caching.CachedContent.get, cache_name)
+            return genai.GenerativeModel.from_cached_content(cached_content)
+        except Exception as e:
+            logger.info("Context cache %s expired, recreating: %s", cache_name, e)
+    
+    try:
+        cached_content = await asyncio.to_thread(
+            caching.CachedContent.create,
+            model=CHAT_MODEL,
+            system_instruction=CHAT_SYSTEM_INSTRUCTION,
+            contents=[video_context],
+            ttl=CONTEXT_CACHE_TTL
+        )
+    except Exception as e:
+        logger.info("Context caching unavailable, sending full context: %s", e)
+        return None
+    
+    await run_query(supabase.table("chat_conversations").update({"context_cache_name": cached_content.name}).eq("id", conv_data["id"]))
+    return genai.GenerativeModel.from_cached_content(cached_content)
 
-Please provide a helpful response to the user's latest question."""
+async def send_message(request: SendMessageRequest) -> AsyncIterator[bytes]:
+    """Send a message and stream the AI response as newline-delimited JSON events"""
+    # Get the conversation, its messages and the original summary in one request
+    conv_response = await run_query(
+        supabase.table("chat_conversations")
+        .select(f"id, context_cache_name, chat_messages({MESSAGE_COLUMNS}), summaries(title,summary,transcript)")
+        .eq("id", request.conversation_id)
+        .order("created_at", foreign_table="chat_messages")
+    )
+    if not conv_response.data:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    conv_data = conv_response.data[0]
+    summary_data = conv_data.get("summaries")
+    if not summary_data:
+        raise HTTPException(status_code=404, detail="Summary not found")
+    
+    previous_messages = conv_data.get("chat_messages") or []
+    
+    # Save user message
+    user_message_data = {
+        "conversation_id": request.conversation_id,
+        "role": "user",
+        "content": request.message
+    }
+    
+    user_msg_response = await run_query(supabase.table("chat_messages").insert(user_message_data))
+    if not user_msg_response.data:
+        raise HTTPException(status_code=500, detail="Failed to save user message")
+    
+    # Prepare context for AI
+    video_context = VIDEO_CONTEXT_TEMPLATE.format(
+        title=summary_data['title'],
+        summary=summary_data['summary'],
+        transcript=summary_data.get('transcript') or 'No transcript available'
+    )
+    
+    # Previous messages become the chat history; Gemini calls the assistant role "model"
+    history = [
+        {"role": "model" if msg["role"] == "assistant" else "user", "parts": [msg["content"]]}
+        for msg in previous_messages
+    ]
+    
+    # Generate AI response using Gemini
+    if not GEMINI_API_KEY:
+        raise HTTPException(status_code=500, detail="Gemini API key not configured")
+    
+    # Reuse the cached video context when possible so the transcript isn't resent every turn
+    model = await get_cached_context_model(conv_data, video_context)
+    if model is None:
+        model = chat_model
+        history.insert(0, {"role": "user", "parts": [video_context]})
+    
+    chat = model.start_chat(history=history)
+    
+    async def stream_response() -> AsyncIterator[bytes]:
+        try:
+            # Forward the answer as it is generated instead of waiting for the full completion
+            response = await chat.send_message_async(request.message, stream=True)
+            response_parts = []
+            async for chunk in response:
+                if chunk.parts and chunk.text:
+                    response_parts.append(chunk.text)
+                    yield orjson.dumps({'type': 'delta', 'content': chunk.text}) + b'\n'
             
-            response = model.generate_content(prompt)
-            ai_response_text = response.text if hasattr(response, 'text') else str(response)
+            ai_response_text = ''.join(response_parts)
             
             # Save AI message
             ai_message_data = {
@@ -216,11 +237,11 @@ Please provide a helpful response to the user's latest question."""
                 "content": ai_response_text
             }
             
-            ai_msg_response = supabase.table("chat_messages").insert(ai_message_data).execute()
+            ai_msg_response = await run_query(supabase.table("chat_messages").insert(ai_message_data))
             if not ai_msg_response.data:
-                raise HTTPException(status_code=500, detail="Failed to save AI message")
+                raise Exception("Failed to save AI message")
             
-            return ChatResponse(
+            chat_response = ChatResponse(
                 conversation_id=request.conversation_id,
                 message=ChatMessage(
                     role="assistant",
@@ -228,22 +249,16 @@ Please provide a helpful response to the user's latest question."""
                     created_at=ai_msg_response.data[0]["created_at"]
                 )
             )
+            yield orjson.dumps({'type': 'complete', **chat_response.model_dump(mode='json')}) + b'\n'
         
         except Exception as e:
-            logger.error(f"Error generating AI response: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to generate AI response: {str(e)}")
-        
-    except Exception as e:
-        logger.error(f"Error sending message: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
+            logger.error("Error generating AI response: %s", e)
+            yield orjson.dumps({'type': 'error', 'message': f"Failed to generate AI response: {str(e)}"}) + b'\n'
+    
+    return stream_response()
 
 async def delete_conversation(conversation_id: str) -> bool:
     """Delete a conversation and all its messages"""
-    try:
-        # Delete conversation (messages will be deleted automatically due to CASCADE)
-        response = supabase.table("chat_conversations").delete().eq("id", conversation_id).execute()
-        return len(response.data) > 0
-        
-    except Exception as e:
-        logger.error(f"Error deleting conversation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to delete conversation: {str(e)}") 
\ No newline at end of file
+    # Delete conversation (messages will be deleted automatically due to CASCADE)
+    response = await run_query(supabase.table("chat_conversations").delete().eq("id", conversation_id))
+    return len(response.data) > 0
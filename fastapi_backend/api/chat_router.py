@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from typing import List
+import logging
 from .chat import (
     ChatConversation, 
-    ChatResponse, 
     CreateConversationRequest, 
     SendMessageRequest,
     create_conversation,
@@ -12,32 +13,73 @@ from .chat import (
     delete_conversation
 )
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Logger
+logger = logging.getLogger(__name__)
 
 @router.post("/chat/conversations", response_model=ChatConversation)
 async def create_chat_conversation(request: CreateConversationRequest):
     """Create a new chat conversation for a summary"""
-    return await create_conversation(request)
+    try:
+        return await create_conversation(request)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error creating conversation")
+        raise HTTPException(status_code=500, detail="Failed to create conversation")
 
 @router.get("/chat/conversations/{summary_id}", response_model=List[ChatConversation])
 async def get_chat_conversations(summary_id: str):
     """Get all conversations for a summary"""
-    return await get_conversations(summary_id)
+    try:
+        return await get_conversations(summary_id)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error getting conversations")
+        raise HTTPException(status_code=500, detail="Failed to get conversations")
 
 @router.get("/chat/conversation/{conversation_id}", response_model=ChatConversation)
 async def get_chat_conversation(conversation_id: str):
     """Get a specific conversation with its messages"""
-    return await get_conversation(conversation_id)
+    try:
+        return await get_conversation(conversation_id)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error getting conversation")
+        raise HTTPException(status_code=500, detail="Failed to get conversation")
 
-@router.post("/chat/message", response_model=ChatResponse)
+@router.post("/chat/message")
 async def send_chat_message(request: SendMessageRequest):
-    """Send a message and get AI response"""
-    return await send_message(request)
+    """Send a message and stream the AI response"""
+    try:
+        events = await send_message(request)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error sending message")
+        raise HTTPException(status_code=500, detail="Failed to send message")
+
+    return StreamingResponse(
+        events,
+        media_type="application/x-ndjson",
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+        }
+    )
 
 @router.delete("/chat/conversation/{conversation_id}")
 async def delete_chat_conversation(conversation_id: str):
     """Delete a conversation and all its messages"""
-    success = await delete_conversation(conversation_id)
+    try:
+        success = await delete_conversation(conversation_id)
+    except Exception:
+        logger.exception("Error deleting conversation")
+        raise HTTPException(status_code=500, detail="Failed to delete conversation")
+
     if success:
         return {"message": "Conversation deleted successfully"}
     else:
@@ -1,25 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import logging
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+from lib.supabase_client import supabase, run_query, extract_title_from_content
 
-from lib.supabase_client import supabase, extract_title_from_content
-
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Logger
 logger = logging.getLogger(__name__)
 
+# Columns read into SummaryItem - the list view skips the transcript and only
+# reads the has_transcript computed column (see supabase-schema.sql)
+SUMMARY_LIST_COLUMNS = 'id, video_id, title, summary, has_transcript, language, video_url, created_at, updated_at'
+SUMMARY_DETAIL_COLUMNS = 'id, video_id, title, summary, transcript, language, video_url, created_at, updated_at'
+
+# Default and maximum number of summaries returned per history page
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
 class SummaryItem(BaseModel):
     id: str
     videoId: str
     title: str
     content: str
     transcript: Optional[str] = None
+    hasTranscript: bool = False
     language: str
     mode: str
     source: str
@@ -33,19 +40,48 @@ class DeleteResponse(BaseModel):
     success: bool
     message: str
 
-@router.get("/history", response_model=HistoryResponse)
-async def get_summaries_history():
-    """Get all summaries from the database"""
+def to_summary_item(summary: Dict[str, Any]) -> SummaryItem:
+    """Map a summaries row to the format expected by the frontend"""
+    content = summary.get('summary') or ''
+    transcript = summary.get('transcript')
+    # Infer mode and source from the URL
+    is_upload = (summary.get('video_url') or '').startswith('s3://')
     
+    # Rows come straight from the database, so skip per-field validation
+    return SummaryItem.model_construct(
+        id=summary.get('id', ''),
+        videoId=summary.get('video_id', ''),
+        title=summary.get('title') or extract_title_from_content(content),
+        content=content,  # Map summary to content for compatibility
+        transcript=transcript,
+        hasTranscript=summary.get('has_transcript', bool(transcript)),
+        language=summary.get('language', 'en'),
+        mode='video' if is_upload else 'youtube',
+        source='upload' if is_upload else 'youtube',
+        createdAt=summary.get('created_at', ''),
+        updatedAt=summary.get('updated_at')
+    )
+
+@router.get("/history", response_model=HistoryResponse)
+async def get_summaries_history(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    """Get a page of summaries from the database, newest first"""
     try:
         if not supabase:
             raise HTTPException(
                 status_code=503,
                 detail={"error": "Database service not available. Please configure Supabase environment variables."}
             )
-            
-        result = supabase.table('summaries').select('*').order('created_at', desc=True).execute()
         
+        result = await run_query(
+            supabase.table('summaries')
+            .select(SUMMARY_LIST_COLUMNS)
+            .order('created_at', desc=True)
+            .range(offset, offset + limit - 1)
+        )
+    
         if result.data is None:
             logger.error('Failed to fetch summaries from database')
             raise HTTPException(
@@ -53,88 +89,84 @@ async def get_summaries_history():
                 detail={"error": "Failed to fetch summaries"}
             )
 
-        processed_summaries = []
-        for summary in result.data:
-            # Process each summary to match the expected format
-            processed_summary = SummaryItem(
-                id=summary.get('id', ''),
-                videoId=summary.get('video_id', ''),
-                title=summary.get('title', extract_title_from_content(summary.get('summary', ''))),
-                content=summary.get('summary', ''),  # Map summary to content for compatibility
-                transcript=summary.get('transcript'),
-                language=summary.get('language', 'en'),
-                mode='video' if summary.get('video_url', '').startswith('s3://') else 'youtube',  # Infer mode from URL
-                source='upload' if summary.get('video_url', '').startswith('s3://') else 'youtube',  # Infer source from URL
-                createdAt=summary.get('created_at', ''),
-                updatedAt=summary.get('updated_at')
-            )
-            processed_summaries.append(processed_summary)
+        return HistoryResponse.model_construct(summaries=[to_summary_item(summary) for summary in result.data])
 
-        return HistoryResponse(summaries=processed_summaries)
-        
     except HTTPException:
         raise
-    except Exception as error:
-        logger.error(f'Error fetching summaries: {str(error)}')
+    except Exception:
+        logger.exception('Error fetching summaries')
         raise HTTPException(
             status_code=500,
             detail={"error": "Failed to fetch summaries"}
         )
 
+@router.get("/history/{summary_id}", response_model=SummaryItem)
+async def get_summary(summary_id: str):
+    """Get a single summary including its transcript"""
+    try:
+        if not supabase:
+            raise HTTPException(
+                status_code=503,
+                detail={"error": "Database service not available. Please configure Supabase environment variables."}
+            )
+    
+        result = await run_query(supabase.table('summaries').select(SUMMARY_DETAIL_COLUMNS).eq('id', summary_id).limit(1))
+        if not result.data:
+            raise HTTPException(
+                status_code=404,
+                detail={"error": "Summary not found"}
+            )
+    
+        return to_summary_item(result.data[0])
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception('Error fetching summary')
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Failed to fetch summary"}
+        )
+
 @router.delete("/history/{summary_id}", response_model=DeleteResponse)
 async def delete_summary(summary_id: str):
     """Delete a summary and all its associated conversations and messages"""
-    
     try:
         if not supabase:
             raise HTTPException(
                 status_code=503,
                 detail={"error": "Database service not available. Please configure Supabase environment variables."}
             )
-        
+    
         # First, verify the summary exists
-        summary_result = supabase.table('summaries').select('*').eq('id', summary_id).execute()
-        if not summary_result.data:
+        summary_result = await run_query(supabase.table('summaries').select('id', count='exact', head=True).eq('id', summary_id))
+        if not summary_result.count:
             raise HTTPException(
                 status_code=404,
                 detail={"error": "Summary not found"}
             )
-        
-        # Get all conversations for this summary
-        conversations_result = supabase.table('chat_conversations').select('id').eq('summary_id', summary_id).execute()
-        conversation_ids = [conv['id'] for conv in conversations_result.data] if conversations_result.data else []
-        
-        # Delete all messages for these conversations (if any)
-        if conversation_ids:
-            for conv_id in conversation_ids:
-                messages_delete = supabase.table('chat_messages').delete().eq('conversation_id', conv_id).execute()
-                logger.info(f"Deleted messages for conversation {conv_id}")
-        
-        # Delete all conversations for this summary
-        if conversation_ids:
-            conversations_delete = supabase.table('chat_conversations').delete().eq('summary_id', summary_id).execute()
-            logger.info(f"Deleted {len(conversation_ids)} conversations for summary {summary_id}")
-        
-        # Finally, delete the summary itself
-        summary_delete = supabase.table('summaries').delete().eq('id', summary_id).execute()
-        
+    
+        # Delete the summary; conversations and messages are removed by the
+        # ON DELETE CASCADE foreign keys in supabase-schema.sql
+        summary_delete = await run_query(supabase.table('summaries').delete().eq('id', summary_id))
+    
         if not summary_delete.data:
             raise HTTPException(
                 status_code=500,
                 detail={"error": "Failed to delete summary"}
             )
-        
-        logger.info(f"Successfully deleted summary {summary_id} and all associated data")
+    
+        logger.info("Successfully deleted summary %s and all associated data", summary_id)
         return DeleteResponse(
             success=True,
             message="Summary and all associated conversations deleted successfully"
         )
-        
+
     except HTTPException:
         raise
-    except Exception as error:
-        logger.error(f'Error deleting summary {summary_id}: {str(error)}')
+    except Exception:
+        logger.exception('Error deleting summary')
         raise HTTPException(
             status_code=500,
-            detail={"error": f"Failed to delete summary: {str(error)}"}
-        ) 
\ No newline at end of file
+            detail={"error": "Failed to delete summary"}
+        )
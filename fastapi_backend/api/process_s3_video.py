@@ -1,17 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-import json
-import asyncio
+import orjson
 import logging
-from datetime import datetime
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
-
-from lib.supabase_client import supabase
+from lib.gemini import SUMMARY_MODEL
+from lib.supabase_client import supabase, insert_summary
 from lib.aws_s3 import s3_downloader
 from lib.google_files import google_files_processor, VideoProcessingResult
 
@@ -27,16 +21,13 @@ class ProcessS3VideoRequest(BaseModel):
 # Process video using S3 → Google Files API → Gemini workflow
 async def process_video_from_s3(s3_key: str, file_name: str) -> VideoProcessingResult:
     try:
-        logger.info(f"Starting S3 → Google Files → Gemini workflow for: {file_name} (S3 key: {s3_key})")
+        logger.info("Starting S3 → Google Files → Gemini workflow for: %s (S3 key: %s)", file_name, s3_key)
         
         # Step 1: Download video from S3
         logger.info('Step 1: Downloading from S3...')
         download_result = await s3_downloader.download_file(s3_key)
         
-        logger.info(f"Downloaded {download_result['contentLength']} bytes from S3", {
-            'contentType': download_result['contentType'],
-            'size': download_result['contentLength']
-        })
+        logger.info("Downloaded %s bytes from S3 (contentType=%s)", download_result['contentLength'], download_result['contentType'])
         
         # Step 2: Process with Google Files API + Gemini
         logger.info('Step 2: Processing with Google Files API + Gemini...')
@@ -50,7 +41,7 @@ async def process_video_from_s3(s3_key: str, file_name: str) -> VideoProcessingR
         return result
         
     except Exception as error:
-        logger.error(f'S3 → Google Files → Gemini workflow failed: {str(error)}')
+        logger.error('S3 → Google Files → Gemini workflow failed: %s', error)
         raise Exception(f"Video processing failed: {str(error)}")
 
 @router.post("/process-s3-video")
@@ -63,46 +54,68 @@ async def process_s3_video(request: ProcessS3VideoRequest):
             detail="Missing required fields: s3Key, fileName"
         )
 
-    logger.info(f"Processing S3 video: {request.s3Key}, fileName: {request.fileName}")
+    logger.info("Processing S3 video: %s, fileName: %s", request.s3Key, request.fileName)
 
     async def stream_response():
         try:
-            yield json.dumps({
+            yield orjson.dumps({
                 'type': 'progress',
                 'message': 'Downloading video from S3...',
                 'progress': 10
-            }) + '\n'
+            }) + b'\n'
 
-            # Step 1: Download from S3
-            download_result = await s3_downloader.download_file(request.s3Key)
+            # Step 1: Open the S3 download as a stream
+            download_result = await s3_downloader.stream_file(request.s3Key)
+            try:
+                file_size = download_result['contentLength']
             
-            yield json.dumps({
-                'type': 'progress',
-                'message': 'Uploading to Google Files API...',
-                'progress': 30
-            }) + '\n'
-
-            # Step 2: Upload to Google Files API
-            upload_result = await google_files_processor.upload_to_google_files(
-                download_result['buffer'],
-                request.fileName,
-                download_result['contentType']
-            )
-
-            yield json.dumps({
+                yield orjson.dumps({
+                    'type': 'progress',
+                    'message': 'Uploading to Google Files API...',
+                    'progress': 30
+                }) + b'\n'
+
+                # Step 2: Forward S3 chunks to Google Files API without buffering the whole video
+                upload_url = await google_files_processor.start_resumable_upload(
+                    file_size,
+                    request.fileName,
+                    download_result['contentType']
+                )
+            
+                upload_result = None
+                uploaded = 0
+                async for chunk in download_result['chunks']:
+                    is_last = uploaded + len(chunk) >= file_size
+                    upload_result = await google_files_processor.upload_chunk(upload_url, chunk, uploaded, finalize=is_last)
+                    uploaded += len(chunk)
+                
+                    yield orjson.dumps({
+                        'type': 'progress',
+                        'message': f'Uploading to Google Files API... {uploaded * 100 // file_size}%',
+                        'progress': 30 + uploaded * 20 // file_size
+                    }) + b'\n'
+            finally:
+                # The chunk iterator only closes the body once started, so close it on every exit path
+                await download_result['chunks'].aclose()
+                download_result['body'].close()
+
+            if upload_result is None:
+                raise Exception('Failed to upload to Google Files API: S3 object ended before upload completed')
+
+            yield orjson.dumps({
                 'type': 'progress',
                 'message': 'Waiting for Google Files processing...',
                 'progress': 50
-            }) + '\n'
+            }) + b'\n'
 
             # Step 3: Wait for Google processing
             await google_files_processor.wait_for_file_processing(upload_result.name)
 
-            yield json.dumps({
+            yield orjson.dumps({
                 'type': 'progress',
                 'message': 'Generating transcript and summary with Gemini...',
                 'progress': 70
-            }) + '\n'
+            }) + b'\n'
 
             # Step 4: Process with Gemini
             result = await google_files_processor.process_video_with_gemini(
@@ -111,65 +124,59 @@ async def process_s3_video(request: ProcessS3VideoRequest):
                 download_result['contentType']
             )
 
-            yield json.dumps({
+            yield orjson.dumps({
                 'type': 'progress',
                 'message': 'Cleaning up Google Files...',
                 'progress': 85
-            }) + '\n'
+            }) + b'\n'
 
             # Step 5: Cleanup Google Files
             await google_files_processor.delete_google_file(upload_result.name)
 
-            yield json.dumps({
+            yield orjson.dumps({
                 'type': 'progress',
                 'message': 'Saving to database...',
                 'progress': 90
-            }) + '\n'
+            }) + b'\n'
 
             # Step 6: Save to database
             try:
                 if not supabase:
                     raise Exception('Database service not available. Please configure Supabase environment variables.')
                     
-                db_result = supabase.table('summaries').insert({
+                summary_id = await insert_summary({
                     'video_id': request.s3Key,
                     'title': request.fileName,
                     'video_url': f's3://{request.s3Key}',
                     'summary': result.summary,
                     'transcript': result.transcript,
                     'language': 'en',
-                    'ai_model': 'gemini-2.0-flash-001',
-                    'video_duration': result.duration or 0,
-                    'created_at': datetime.utcnow().isoformat()
-                }).execute()
-
-                if not db_result.data:
-                    raise Exception('No data returned from database insert')
-
-                summary_data = db_result.data[0]
+                    'ai_model': SUMMARY_MODEL,
+                    'video_duration': result.duration or 0
+                })
 
             except Exception as db_error:
-                logger.error(f'Database error: {str(db_error)}')
+                logger.error('Database error: %s', db_error)
                 raise Exception('Failed to save summary to database')
 
-            yield json.dumps({
+            yield orjson.dumps({
                 'type': 'complete',
                 'message': 'Video processing completed successfully!',
                 'progress': 100,
                 'summary': result.summary,
                 'transcript': result.transcript,
-                'summaryId': summary_data['id'],
+                'summaryId': summary_id,
                 'title': request.fileName,
                 's3Key': request.s3Key
-            }) + '\n'
+            }) + b'\n'
 
         except Exception as error:
-            logger.error(f'Video processing failed: {str(error)}')
-            yield json.dumps({
+            logger.error('Video processing failed: %s', error)
+            yield orjson.dumps({
                 'type': 'error',
                 'message': str(error) if str(error) else 'Failed to process video',
                 'progress': 0
-            }) + '\n'
+            }) + b'\n'
 
     return StreamingResponse(
         stream_response(),
@@ -1,82 +1,27 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
 import json
-import asyncio
 import logging
-from datetime import datetime
-import re
 import time
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
-
-import google.generativeai as genai
-import os
-
-from lib.supabase_client import supabase
+from lib.gemini import SUMMARY_MODEL, SUMMARY_REDUCE_WITH_LLM, get_gemini_client, summarize_chunk_batches
+from lib.supabase_client import supabase, insert_summary
+from lib.text_utils import clean_model_output, split_transcript_into_chunks
 
 router = APIRouter()
 
 # Logger
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini client
-def get_gemini_client():
-    api_key = os.getenv('GEMINI_API_KEY')
-    if not api_key:
-        raise ValueError('Gemini API key is not configured. Please add your API key in the environment variables.')
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel("gemini-2.0-flash-001")
-
-# Helper function to clean model outputs
-def clean_model_output(text: str) -> str:
-    text = re.sub(r'^(Okay|Here\'?s?( is)?|Let me|I will|I\'ll|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly|Alright)[^]*?,\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Here\'?s?( is)?|I\'?ll?|Let me|I will|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly)[^]*?(summary|translate|breakdown|analysis).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Based on|According to).*?,\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^I understand.*?[.!]\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Now|First|Let\'s),?\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Here are|The following is|This is|Below is).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(I\'ll provide|Let me break|I\'ll break|I\'ll help|I\'ve structured).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(As requested|Following your|In response to).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^[^:\n🎯🎙️#*\-•]+:\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^(?![#*\-•🎯️])[\s\d]+\.\s*', '', text, flags=re.MULTILINE)
-    return text.strip()
-
-# Function to extract audio from video and generate transcript (mock implementation)
-async def extract_audio_from_video(video_file: UploadFile) -> str:
-    """Extract audio from video and generate transcript"""
-    logger.info(f"Starting audio extraction from video file: {video_file.filename}")
-    
-    try:
-        # For this demo, we'll generate a realistic mock transcript
-        # In production, you would use services like:
-        # - Google Cloud Speech-to-Text
-        # - Azure Speech Services  
-        # - AWS Transcribe
-        # - OpenAI Whisper API
-        
-        logger.info('Processing video file for transcription')
-        
-        # Simulate processing time based on file size
-        processing_delay = min(2, video_file.size / 1000000) if video_file.size else 1  # Max 2 seconds
-        await asyncio.sleep(processing_delay)
-        
-        # Generate a realistic mock transcript based on file properties
-        file_size_mb = round(video_file.size / (1024 * 1024)) if video_file.size else 1
-        estimated_duration_minutes = max(1, min(30, file_size_mb / 10))  # Rough estimate
-        
-        mock_transcript = f"""
-Welcome to this video presentation titled "{video_file.filename.replace('.', '_') if video_file.filename else 'video'}".
+# Placeholder transcript for uploaded videos until a speech-to-text service is wired in
+MOCK_TRANSCRIPT_TEMPLATE = """
+Welcome to this video presentation titled "{title}".
 
 This is a demonstration of our AI-powered video summarization system. In a real-world scenario, 
 this transcript would contain the actual spoken content from your uploaded video file.
 
-The video file you uploaded is approximately {file_size_mb}MB in size, with an estimated duration 
-of {round(estimated_duration_minutes)} minutes. Our system has successfully processed the audio 
-track and extracted the speech content for analysis.
+Our system has successfully processed the audio track of your video file and extracted 
+the speech content for analysis.
 
 Key features of our system include:
 - Support for multiple video formats (MP4, AVI, MOV, MKV, WebM, WMV, FLV)
@@ -106,18 +51,9 @@ structured summaries of your video content.
 
 Thank you for testing our video summarization system. The AI will now analyze this 
 transcript to create a meaningful summary of the content.
-"""
-        
-        logger.info('Mock transcript generated successfully')
-        return mock_transcript.strip()
-        
-    except Exception as error:
-        logger.error(f'Failed to extract audio from video: {str(error)}')
-        raise Exception('Failed to process video audio. Please ensure the video file contains audio.')
+""".strip()
 
-# Function to create summary prompt for video content
-def create_video_summary_prompt(transcript: str, file_name: str) -> str:
-    return f"""
+VIDEO_SUMMARY_PROMPT_TEMPLATE = """
 You are an expert content summarizer. Create a comprehensive summary of the following video content. Do not include any meta-commentary, introductions, or instructions in your response - provide only the summary content.
 
 **Video File:** {file_name}
@@ -152,26 +88,35 @@ Format your response exactly as follows:
 🏷️ **TAGS:** [Relevant tags or categories for the video content]
 """
 
-async def split_transcript_into_chunks(transcript: str, chunk_size: int = 7000, overlap: int = 1000) -> list:
-    words = transcript.split(' ')
-    chunks = []
-    current_chunk = []
-    current_length = 0
-
-    for word in words:
-        if current_length + len(word) > chunk_size and len(current_chunk) > 0:
-            chunks.append(' '.join(current_chunk))
-            overlap_words = current_chunk[-max(1, overlap // 10):]
-            current_chunk = overlap_words
-            current_length = len(' '.join(overlap_words))
+# Function to extract audio from video and generate transcript (mock implementation)
+async def extract_audio_from_video(video_file: UploadFile) -> str:
+    """Extract audio from video and generate transcript"""
+    logger.info("Starting audio extraction from video file: %s", video_file.filename)
+    
+    try:
+        # For this demo, we'll generate a realistic mock transcript
+        # In production, you would use services like:
+        # - Google Cloud Speech-to-Text
+        # - Azure Speech Services  
+        # - AWS Transcribe
+        # - OpenAI Whisper API
         
-        current_chunk.append(word)
-        current_length += len(word) + 1  # +1 for space
-
-    if len(current_chunk) > 0:
-        chunks.append(' '.join(current_chunk))
+        logger.info('Processing video file for transcription')
+        
+        mock_transcript = MOCK_TRANSCRIPT_TEMPLATE.format(
+            title=video_file.filename.replace('.', '_') if video_file.filename else 'video'
+        )
+        
+        logger.info('Mock transcript generated successfully')
+        return mock_transcript
+        
+    except Exception as error:
+        logger.error('Failed to extract audio from video: %s', error)
+        raise Exception('Failed to process video audio. Please ensure the video file contains audio.')
 
-    return chunks
+# Function to create summary prompt for video content
+def create_video_summary_prompt(transcript: str, file_name: str) -> str:
+    return VIDEO_SUMMARY_PROMPT_TEMPLATE.format(file_name=file_name, transcript=transcript)
 
 @router.post("/process-video")
 async def process_video(video: UploadFile = File(...)):
@@ -180,7 +125,7 @@ async def process_video(video: UploadFile = File(...)):
     if not video:
         raise HTTPException(status_code=400, detail="No video file provided")
 
-    logger.info(f"Processing video file: {video.filename}, size: {video.size} bytes")
+    logger.info("Processing video file: %s, size: %s bytes", video.filename, video.size)
 
     async def stream_response():
         try:
@@ -208,33 +153,25 @@ async def process_video(video: UploadFile = File(...)):
 
             # Generate summary using Gemini
             model = get_gemini_client()
-            chunks = await split_transcript_into_chunks(transcript)
+            chunks = split_transcript_into_chunks(transcript)
             summary_content = ''
 
             if len(chunks) == 1:
                 prompt = create_video_summary_prompt(transcript, video.filename or "uploaded_video")
-                response = model.generate_content(prompt)
+                response = await model.generate_content_async(prompt)
                 summary_content = clean_model_output(response.text)
             else:
-                # Process chunks and combine
-                chunk_summaries = []
-                for i, chunk in enumerate(chunks):
-                    yield json.dumps({
-                        'type': 'progress',
-                        'message': f'Processing chunk {i+1} of {len(chunks)}...',
-                        'progress': 60 + (i * 20 // len(chunks))
-                    }) + '\n'
-                    
-                    prompt = create_video_summary_prompt(chunk, video.filename or "uploaded_video")
-                    response = model.generate_content(prompt)
-                    chunk_summary = clean_model_output(response.text)
-                    chunk_summaries.append(chunk_summary)
-
-                # Final summary combining all chunks
-                combined_content = '\n\n'.join(chunk_summaries)
-                final_prompt = create_video_summary_prompt(combined_content, video.filename or "uploaded_video")
-                response = model.generate_content(final_prompt)
-                summary_content = clean_model_output(response.text)
+                # Summarize batches of chunks concurrently, then stitch the per-chunk sections locally
+                async for event in summarize_chunk_batches(model, chunks, 'en', progress_start=60, progress_span=20):
+                    if event['type'] == 'progress':
+                        yield json.dumps(event) + '\n'
+                    else:
+                        summary_content = event['content']
+
+                # A final model pass over the stitched summary is opt-in
+                if SUMMARY_REDUCE_WITH_LLM:
+                    response = await model.generate_content_async(create_video_summary_prompt(summary_content, video.filename or "uploaded_video"))
+                    summary_content = clean_model_output(response.text)
 
             yield json.dumps({
                 'type': 'progress',
@@ -250,25 +187,19 @@ async def process_video(video: UploadFile = File(...)):
                 if not supabase:
                     raise Exception('Database service not available. Please configure Supabase environment variables.')
                     
-                result = supabase.table('summaries').insert({
+                summary_id = await insert_summary({
                     'video_id': video_id,
                     'title': video.filename or 'Uploaded Video',
                     'video_url': f'upload://{video.filename}',
                     'summary': summary_content,
                     'transcript': transcript,
                     'language': 'en',
-                    'ai_model': 'gemini-2.0-flash-001',
-                    'video_duration': 0,
-                    'created_at': datetime.utcnow().isoformat()
-                }).execute()
-
-                if result.data:
-                    summary_id = result.data[0]['id']
-                else:
-                    raise Exception('No data returned from database insert')
+                    'ai_model': SUMMARY_MODEL,
+                    'video_duration': 0
+                })
 
             except Exception as db_error:
-                logger.error(f'Database error: {str(db_error)}')
+                logger.error('Database error: %s', db_error)
                 raise HTTPException(status_code=500, detail='Failed to save summary to database')
 
             # Send completion
@@ -290,7 +221,7 @@ async def process_video(video: UploadFile = File(...)):
                 'progress': 0
             }) + '\n'
         except Exception as error:
-            logger.error(f'Video processing failed: {str(error)}')
+            logger.error('Video processing failed: %s', error)
             yield json.dumps({
                 'type': 'error',
                 'message': str(error) if str(error) else 'Failed to process video',
@@ -1,30 +1,25 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Dict, Any, Optional
+from functools import lru_cache
 import json
 import asyncio
 import logging
-from datetime import datetime
 import re
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
 
 # Import youtube-transcript-api equivalent
 try:
-    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
 except ImportError:
     YouTubeTranscriptApi = None
+    NoTranscriptFound = None
 
-import google.generativeai as genai
 import os
-import tempfile
-import subprocess
-from io import BytesIO
 
-from lib.supabase_client import supabase
+from lib.gemini import SUMMARY_MODEL, SUMMARY_REDUCE_WITH_LLM, get_gemini_client, summarize_chunk_batches
+from lib.supabase_client import supabase, run_query, insert_summary
+from lib.text_utils import clean_model_output, split_transcript_into_chunks
 from lib.youtube_utils import extract_video_id, create_summary_prompt
 
 router = APIRouter()
@@ -39,130 +34,81 @@ class SummarizeRequest(BaseModel):
 class SummarizeResponse(BaseModel):
     gemini: bool
 
-# Initialize Gemini client
-def get_gemini_client():
-    api_key = os.getenv('GEMINI_API_KEY')
-    if not api_key:
-        raise ValueError('Gemini API key is not configured. Please add your API key in the environment variables.')
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel("gemini-2.0-flash-001")
-
-# Helper function to clean model outputs
-def clean_model_output(text: str) -> str:
-    text = re.sub(r'^(Okay|Here\'?s?( is)?|Let me|I will|I\'ll|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly|Alright)[^]*?,\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Here\'?s?( is)?|I\'?ll?|Let me|I will|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly)[^]*?(summary|translate|breakdown|analysis).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Based on|According to).*?,\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^I understand.*?[.!]\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Now|First|Let\'s),?\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Here are|The following is|This is|Below is).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(I\'ll provide|Let me break|I\'ll break|I\'ll help|I\'ve structured).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(As requested|Following your|In response to).*?:\s*', '', text, flags=re.IGNORECASE)
-    
-    # German prefixes
-    text = re.sub(r'^(Okay|Hier( ist)?|Lass mich|Ich werde|Ich kann|Ich würde|Ich möchte|Erlauben Sie mir|Sicher|Natürlich|Gewiss|In Ordnung)[^]*?,\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Hier( ist)?|Ich werde|Lass mich|Ich kann|Ich würde|Ich möchte)[^]*?(Zusammenfassung|Übersetzung|Analyse).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Basierend auf|Laut|Gemäß).*?,\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^Ich verstehe.*?[.!]\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Jetzt|Zunächst|Lass uns),?\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Hier sind|Folgendes|Dies ist|Im Folgenden).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Ich werde|Lass mich|Ich helfe|Ich habe strukturiert).*?:\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^(Wie gewünscht|Entsprechend Ihrer|Als Antwort auf).*?:\s*', '', text, flags=re.IGNORECASE)
-    
-    # Remove meta instructions while preserving markdown
-    text = re.sub(r'^[^:\n🎯🎙️#*\-•]+:\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^(?![#*\-•🎯️])[\s\d]+\.\s*', '', text, flags=re.MULTILINE)
-    
-    return text.strip()
-
-async def split_transcript_into_chunks(transcript: str, chunk_size: int = 7000, overlap: int = 1000) -> list:
-    words = transcript.split(' ')
-    chunks = []
-    current_chunk = []
-    current_length = 0
-
-    for word in words:
-        if current_length + len(word) > chunk_size and len(current_chunk) > 0:
-            chunks.append(' '.join(current_chunk))
-            # Keep last few words for overlap
-            overlap_words = current_chunk[-max(1, overlap // 10):]
-            current_chunk = overlap_words
-            current_length = len(' '.join(overlap_words))
-        
-        current_chunk.append(word)
-        current_length += len(word) + 1  # +1 for space
+# Number of recently fetched transcripts kept in-process, keyed by video ID
+TRANSCRIPT_CACHE_SIZE = 512
+
+# Preferred transcript languages, in order; other languages are used only as a fallback
+TRANSCRIPT_LANGUAGES = ['en', 'en-US', 'en-GB']
 
-    if len(current_chunk) > 0:
-        chunks.append(' '.join(current_chunk))
+# Sentence boundaries used to pick a title from the opening transcript lines
+TITLE_SENTENCE_SPLIT = re.compile(r'[.!?]+')
+
+EXISTING_SUMMARY_COLUMNS = 'id, title, summary, transcript'
+
+async def find_existing_summary(video_id: str, language: str) -> Optional[Dict[str, Any]]:
+    """Return the most recent stored summary for a video and language, if any"""
+    if not supabase:
+        return None
+
+    try:
+        result = await run_query(
+            supabase.table('summaries')
+            .select(EXISTING_SUMMARY_COLUMNS)
+            .eq('video_id', video_id)
+            .eq('language', language)
+            .order('created_at', desc=True)
+            .limit(1)
+        )
+    except Exception as error:
+        logger.warning('Existing summary lookup failed, summarizing from scratch: %s', error)
+        return None
 
-    return chunks
+    return result.data[0] if result.data else None
 
-async def get_transcript(video_id: str) -> Dict[str, Any]:
+@lru_cache(maxsize=TRANSCRIPT_CACHE_SIZE)
+def get_transcript(video_id: str) -> Dict[str, Any]:
     """Get transcript from YouTube video"""
-    logger.info(f"Attempting to fetch YouTube transcript for video {video_id}")
+    logger.info("Attempting to fetch YouTube transcript for video %s", video_id)
     
     if not YouTubeTranscriptApi:
         raise HTTPException(status_code=500, detail="YouTube transcript functionality not available. Please install youtube-transcript-api")
     
     try:
-        # Try fetching transcript with different language options
-        languages = ['en', 'en-US', 'en-GB', None]  # None lets the library auto-detect
-        transcript_list = None
-        last_error = None
+        # Fetch the transcript listing once and pick the best language locally
+        transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+        try:
+            transcript = transcripts.find_transcript(TRANSCRIPT_LANGUAGES)
+        except NoTranscriptFound:
+            # Fall back to whatever the video has, e.g. a generated track in another language
+            transcript = next(iter(transcripts), None)
+            if not transcript:
+                raise Exception('No transcript found after trying all language options')
 
-        for lang in languages:
-            try:
-                logger.info(f"Trying to fetch transcript with language: {lang or 'auto-detect'}")
-                
-                if lang:
-                    transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang])
-                else:
-                    transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-                
-                if transcript_list and len(transcript_list) > 0:
-                    logger.info(f"Successfully fetched transcript with language: {lang or 'auto-detect'}")
-                    break
-            except Exception as error:
-                last_error = error
-                logger.info(f"Failed to fetch transcript with language {lang or 'auto-detect'}: {str(error)}")
-                continue
-
-        # If we still don't have a transcript, throw the last error
-        if not transcript_list or len(transcript_list) == 0:
-            raise last_error or Exception('No transcript found after trying all language options')
+        logger.info("Fetching transcript with language: %s", transcript.language_code)
+        transcript_list = transcript.fetch()
+
+        if not transcript_list:
+            raise Exception('No transcript found after trying all language options')
 
         # Process the transcript
         transcript_text = ' '.join([item['text'] for item in transcript_list]).strip()
         
-        logger.info('Raw transcript fetched', {
-            'itemCount': len(transcript_list),
-            'textLength': len(transcript_text),
-            'firstItems': [item['text'] for item in transcript_list[:3]]
-        })
+        logger.info('Raw transcript fetched: itemCount=%d textLength=%d', len(transcript_list), len(transcript_text))
         
         # Check if the transcript text is meaningful
         if not transcript_text or len(transcript_text) < 50:
             raise Exception(f"Transcript too short: only {len(transcript_text)} characters")
 
-        # Extract title from transcript - try to get a meaningful title
-        title = 'YouTube Video Summary'
-        try:
-            first_few_lines = ' '.join([item['text'] for item in transcript_list[:10]])
-            sentences = re.split(r'[.!?]+', first_few_lines)
-            
-            for sentence in sentences:
-                clean_sentence = sentence.strip()
-                if 20 < len(clean_sentence) < 100:
-                    title = clean_sentence
-                    break
-        except Exception as title_error:
-            logger.info('Could not extract title from transcript, using default')
-
-        logger.info('Successfully processed YouTube transcript', {
-            'title': title,
-            'itemsCount': len(transcript_list),
-            'transcriptLength': len(transcript_text),
-            'firstChars': transcript_text[:100]
-        })
+        # Extract title from transcript - the first sentence of a plausible title length
+        first_few_lines = ' '.join([item['text'] for item in transcript_list[:10]])
+        title = next(
+            (sentence for sentence in map(str.strip, TITLE_SENTENCE_SPLIT.split(first_few_lines)) if 20 < len(sentence) < 100),
+            'YouTube Video Summary'
+        )
+
+        logger.info('Successfully processed YouTube transcript: title=%r transcriptLength=%d', title, len(transcript_text))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Transcript starts with: %r', transcript_text[:100])
 
         return {
             'transcript': transcript_text,
@@ -179,7 +125,7 @@ async def get_transcript(video_id: str) -> Dict[str, Any]:
             'errorType': type(error).__name__
         }
         
-        logger.error(f'Failed to get transcript - detailed error: {error_details}')
+        logger.error('Failed to get transcript - detailed error: %s', error_details)
         
         # Try to provide more specific error messages
         error_message = 'This video doesn\'t have transcripts available.'
@@ -213,12 +159,7 @@ async def summarize_video(request: SummarizeRequest):
             video_id = extract_video_id(request.url)
             mode = "video"  # Always use video mode
 
-            logger.info('Processing video request', {
-                'videoId': video_id,
-                'language': request.language,
-                'mode': 'video',
-                'aiModel': 'gemini'
-            })
+            logger.info('Processing video request: videoId=%s language=%s', video_id, request.language)
 
             # Send initial progress
             yield json.dumps({
@@ -227,6 +168,22 @@ async def summarize_video(request: SummarizeRequest):
                 'progress': 5
             }) + '\n'
 
+            # Reuse a stored summary for the same video and language instead of re-running the pipeline
+            existing = await find_existing_summary(video_id, request.language)
+            if existing:
+                logger.info("Reusing stored summary %s for video %s", existing['id'], video_id)
+                yield json.dumps({
+                    'type': 'complete',
+                    'message': 'Video processing completed successfully!',
+                    'progress': 100,
+                    'summary': existing['summary'],
+                    'transcript': existing['transcript'],
+                    'summaryId': existing['id'],
+                    'title': existing['title'],
+                    'videoId': video_id
+                }) + '\n'
+                return
+
             # Get transcript
             yield json.dumps({
                 'type': 'progress', 
@@ -234,7 +191,7 @@ async def summarize_video(request: SummarizeRequest):
                 'progress': 20
             }) + '\n'
 
-            transcript_data = await get_transcript(video_id)
+            transcript_data = await asyncio.to_thread(get_transcript, video_id)
             transcript = transcript_data['transcript']
             title = transcript_data['title']
 
@@ -252,33 +209,25 @@ async def summarize_video(request: SummarizeRequest):
 
             # Generate summary using Gemini with visual context
             model = get_gemini_client()
-            chunks = await split_transcript_into_chunks(transcript)
+            chunks = split_transcript_into_chunks(transcript)
             summary_content = ''
 
             if len(chunks) == 1:
                 prompt = create_summary_prompt(transcript, request.language)
-                response = model.generate_content(prompt)
+                response = await model.generate_content_async(prompt)
                 summary_content = clean_model_output(response.text)
             else:
-                # Process chunks and combine
-                chunk_summaries = []
-                for i, chunk in enumerate(chunks):
-                    yield json.dumps({
-                        'type': 'progress',
-                        'message': f'Processing chunk {i+1} of {len(chunks)}...',
-                        'progress': 60 + (i * 15 // len(chunks))
-                    }) + '\n'
-                    
-                    prompt = create_summary_prompt(chunk, request.language)
-                    response = model.generate_content(prompt)
-                    chunk_summary = clean_model_output(response.text)
-                    chunk_summaries.append(chunk_summary)
-
-                # Combine all chunk summaries
-                combined_content = '\n\n'.join(chunk_summaries)
-                final_prompt = create_summary_prompt(combined_content, request.language)
-                response = model.generate_content(final_prompt)
-                summary_content = clean_model_output(response.text)
+                # Summarize batches of chunks concurrently, then stitch the per-chunk sections locally
+                async for event in summarize_chunk_batches(model, chunks, request.language, progress_start=60, progress_span=15):
+                    if event['type'] == 'progress':
+                        yield json.dumps(event) + '\n'
+                    else:
+                        summary_content = event['content']
+
+                # A final model pass over the stitched summary is opt-in
+                if SUMMARY_REDUCE_WITH_LLM:
+                    response = await model.generate_content_async(create_summary_prompt(summary_content, request.language))
+                    summary_content = clean_model_output(response.text)
 
             yield json.dumps({
                 'type': 'progress',
@@ -291,25 +240,19 @@ async def summarize_video(request: SummarizeRequest):
                 if not supabase:
                     raise Exception('Database service not available. Please configure Supabase environment variables.')
                     
-                result = supabase.table('summaries').insert({
+                summary_id = await insert_summary({
                     'video_id': video_id,
                     'title': title,
                     'video_url': request.url,
                     'summary': summary_content,
                     'transcript': transcript,
                     'language': request.language,
-                    'ai_model': 'gemini-2.0-flash-001',
-                    'video_duration': 0,
-                    'created_at': datetime.utcnow().isoformat()
-                }).execute()
-
-                if result.data:
-                    summary_id = result.data[0]['id']
-                else:
-                    raise Exception('No data returned from database insert')
+                    'ai_model': SUMMARY_MODEL,
+                    'video_duration': 0
+                })
 
             except Exception as db_error:
-                logger.error(f'Database error: {str(db_error)}')
+                logger.error('Database error: %s', db_error)
                 raise HTTPException(status_code=500, detail='Failed to save summary to database')
 
             # Send completion
@@ -331,7 +274,7 @@ async def summarize_video(request: SummarizeRequest):
                 'progress': 0
             }) + '\n'
         except Exception as error:
-            logger.error(f'Video processing failed: {str(error)}')
+            logger.error('Video processing failed: %s', error)
             yield json.dumps({
                 'type': 'error',
                 'message': str(error) if str(error) else 'Failed to process video',
@@ -1,37 +1,65 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Tuple
 import logging
-from dotenv import load_dotenv
+import orjson
+import os
+from urllib.parse import urlencode
 
 from lib.aws_s3 import s3_upload, validate_aws_config
 
-# Load environment variables from .env file
-load_dotenv()
-
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Logger
 logger = logging.getLogger(__name__)
 
+# Files up to this size are PUT to the backend, which forwards them to S3 over its pooled
+# connection. 0 disables it - the upload URL is built from the request's host, so only
+# enable it where that is the browser-facing address (not behind a TLS-terminating proxy)
+DIRECT_UPLOAD_MAX_BYTES = int(os.getenv("DIRECT_UPLOAD_MAX_BYTES", 0))
+
 class PresignedUploadRequest(BaseModel):
     fileName: str
     fileType: str
     fileSize: int
 
-class PresignedUploadResponse(BaseModel):
-    success: bool
-    uploadUrl: str
-    key: str
-    fields: Optional[Dict[str, Any]] = None
+def parse_presigned_upload_request(body: bytes) -> Optional[Tuple[str, str, int]]:
+    """fileName, fileType and fileSize from a presigned upload request body, or None if any is missing or invalid.
+
+    Checked by hand instead of through PresignedUploadRequest, which only documents the body.
+    """
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+
+    file_name = payload.get('fileName')
+    file_type = payload.get('fileType')
+    file_size = payload.get('fileSize')
+    if not file_name or not isinstance(file_name, str) or not file_type or not isinstance(file_type, str):
+        return None
+    if not isinstance(file_size, int) or isinstance(file_size, bool) or file_size <= 0:
+        return None
+    return file_name, file_type, file_size
 
 class ErrorResponse(BaseModel):
     error: str
     missing: Optional[list] = None
     message: Optional[str] = None
 
-@router.post("/upload/presigned", response_model=PresignedUploadResponse)
-async def create_presigned_upload_url(request: PresignedUploadRequest):
+@router.post(
+    "/upload/presigned",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": PresignedUploadRequest.model_json_schema()}}
+        }
+    }
+)
+async def create_presigned_upload_url(http_request: Request):
     """Generate a presigned URL for S3 upload"""
     
     try:
@@ -48,14 +76,16 @@ async def create_presigned_upload_url(request: PresignedUploadRequest):
             )
 
         # Validate input
-        if not request.fileName or not request.fileType or not request.fileSize:
+        upload_request = parse_presigned_upload_request(await http_request.body())
+        if upload_request is None:
             raise HTTPException(
                 status_code=400,
                 detail={"error": "Missing required fields: fileName, fileType, fileSize"}
             )
+        file_name, file_type, file_size = upload_request
 
         # Validate file type
-        if not request.fileType.startswith('video/'):
+        if not file_type.startswith('video/'):
             raise HTTPException(
                 status_code=400,
                 detail={"error": "Only video files are allowed"}
@@ -63,34 +93,80 @@ async def create_presigned_upload_url(request: PresignedUploadRequest):
 
         # Validate file size (500MB limit)
         max_size = 500 * 1024 * 1024  # 500MB
-        if request.fileSize > max_size:
+        if file_size > max_size:
             raise HTTPException(
                 status_code=400,
                 detail={"error": "File size too large. Maximum 500MB allowed."}
             )
 
+        # Small files skip the presigned URL and go through the backend
+        if DIRECT_UPLOAD_MAX_BYTES > 0 and file_size <= DIRECT_UPLOAD_MAX_BYTES:
+            direct_params = s3_upload.get_direct_upload_params(file_name, file_type)
+            return {
+                'success': True,
+                'mode': 'direct',
+                'uploadUrl': f"{http_request.url_for('upload_direct')}?{urlencode(direct_params)}",
+                'key': direct_params['key'],
+                'fields': None
+            }
+
         # Generate presigned URL
         presigned_data = await s3_upload.get_presigned_upload_url(
-            request.fileName,
-            request.fileType,
-            request.fileSize
+            file_name,
+            file_type,
+            file_size
         )
 
-        return PresignedUploadResponse(
-            success=True,
-            uploadUrl=presigned_data['uploadUrl'],
-            key=presigned_data['key'],
-            fields=presigned_data.get('fields')
-        )
+        # Plain dict serialized by orjson - no response model validation on the way out
+        return {
+            'success': True,
+            'mode': 'presigned',
+            'uploadUrl': presigned_data['uploadUrl'],
+            'key': presigned_data['key'],
+            'fields': presigned_data.get('fields')
+        }
 
     except HTTPException:
         raise
     except Exception as error:
-        logger.error(f"Failed to generate presigned URL: {str(error)}")
+        logger.error("Failed to generate presigned URL: %s", error)
         raise HTTPException(
             status_code=500,
             detail={
                 "error": "Failed to generate upload URL",
                 "message": str(error)
             }
-        ) 
\ No newline at end of file
+        )
+
+@router.put("/upload/direct")
+async def upload_direct(http_request: Request, key: str, expires: str, token: str):
+    """Receive a small file and store it in S3 (issued by /upload/presigned for files under DIRECT_UPLOAD_MAX_BYTES)"""
+    content_type = http_request.headers.get('content-type', '')
+    if not s3_upload.verify_direct_upload(key, content_type, expires, token):
+        raise HTTPException(
+            status_code=403,
+            detail={"error": "Invalid or expired upload link"}
+        )
+
+    body = bytearray()
+    async for chunk in http_request.stream():
+        body += chunk
+        if len(body) > DIRECT_UPLOAD_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail={"error": "File too large for direct upload"}
+            )
+
+    try:
+        result = await s3_upload.put_file(key, bytes(body), content_type)
+    except Exception as error:
+        logger.error("Direct upload failed: %s", error)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Failed to upload file",
+                "message": str(error)
+            }
+        )
+
+    return {'success': True, 'key': result.key}
@@ -1,17 +1,77 @@
 import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+import asyncio
+import hashlib
+import hmac
+import itertools
 import os
-from typing import Dict, Any, Optional, Tuple
+import re
+import secrets
+import threading
+from typing import Dict, Any, List, Optional, AsyncIterator, BinaryIO, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 import logging
 import time
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
+# Size of the chunks yielded by stream_file - a multiple of 256 KiB so they
+# can be forwarded as-is to resumable upload APIs
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Multipart settings for upload_file - the file is read and sent 8 MiB at a time,
+# so memory use stays flat regardless of the video's size
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4
+)
+
+# Shared by every request in the process: keep sockets alive and pooled, and use the
+# standard retry mode (adaptive backoff, fewer retries) instead of the legacy one
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 3}
+)
+
+class ChunkBufferPool:
+    """Reusable fixed-size chunk buffers; acquire waits while max_buffers are in use"""
+
+    def __init__(self, chunk_size: int, max_buffers: int):
+        self.chunk_size = chunk_size
+        self._slots = asyncio.Semaphore(max_buffers)
+        self._free: List[bytearray] = []
+
+    async def acquire(self) -> bytearray:
+        await self._slots.acquire()
+        return self._free.pop() if self._free else bytearray(self.chunk_size)
+
+    def release(self, buffer: bytearray) -> None:
+        self._free.append(buffer)
+        self._slots.release()
+
+# Buffers for streamed downloads, so concurrent S3 transfers reuse a bounded amount of memory
+CHUNK_BUFFER_POOL_SIZE = 8
+chunk_buffers = ChunkBufferPool(DOWNLOAD_CHUNK_SIZE, CHUNK_BUFFER_POOL_SIZE)
+
+# Anything but letters, digits, '.', '-' and '_' is replaced in object keys
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]')
+
+# Per-process sequence so keys created in the same millisecond still differ
+_key_sequence = itertools.count()
+
+def _time_ordered_id() -> str:
+    """Sortable unique id in hex: millisecond timestamp, a per-process sequence and random bits"""
+    return f"{time.time_ns() // 1_000_000:012x}{next(_key_sequence) & 0xffff:04x}{secrets.token_hex(4)}"
+
+def _hmac_sha256(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
 @dataclass
 class UploadProgress:
     loaded: int
@@ -33,32 +93,122 @@ class S3MultipartUpload:
         if not self.bucket:
             raise ValueError("AWS S3 bucket name is required. Set AWS_S3_BUCKET environment variable.")
         
+        self.region = os.getenv("AWS_REGION", "us-east-1")
+        self.access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
+        self.secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+
         # Initialize S3 client
         self.s3_client = boto3.client(
             's3',
-            region_name=os.getenv("AWS_REGION", "us-east-1"),
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+            region_name=self.region,
+            aws_access_key_id=self.access_key_id,
+            aws_secret_access_key=self.secret_access_key,
+            aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
+            config=S3_CLIENT_CONFIG
         )
+
+        # Presigned URLs are signed locally; the SigV4 signing key only changes once a day
+        # (or when the client's credentials rotate)
+        self._signing_keys: Dict[Tuple[str, str], bytes] = {}
+        self._signing_key_lock = threading.Lock()
+        if '.' in self.bucket:
+            # Dotted bucket names don't match the wildcard TLS certificate, so use path-style URLs
+            self._host = f"s3.{self.region}.amazonaws.com"
+            self._path_prefix = f"/{self.bucket}/"
+        else:
+            self._host = f"{self.bucket}.s3.{self.region}.amazonaws.com"
+            self._path_prefix = "/"
+
+    def _object_key(self, file_name: str) -> str:
+        """S3 key for an uploaded file: a unique time-ordered id plus the name with unsafe characters replaced"""
+        return f"{self.key_prefix}{_time_ordered_id()}_{UNSAFE_FILENAME_CHARS.sub('_', file_name)}"
+
+    def _signing_key(self, secret_key: str, date_stamp: str) -> bytes:
+        """SigV4 signing key for a secret key and UTC date (YYYYMMDD), derived once and reused for that day"""
+        with self._signing_key_lock:
+            signing_key = self._signing_keys.get((secret_key, date_stamp))
+            if signing_key is None:
+                signing_key = _hmac_sha256(f"AWS4{secret_key}".encode('utf-8'), date_stamp)
+                for scope_part in (self.region, 's3', 'aws4_request'):
+                    signing_key = _hmac_sha256(signing_key, scope_part)
+                # Drop keys for past days and rotated credentials - only the current pair is requested again
+                self._signing_keys = {(secret_key, date_stamp): signing_key}
+            return signing_key
+
+    def _presign_url(self, method: str, key: str, headers: Dict[str, str], params: Dict[str, str], expires_in: int) -> str:
+        """Build a SigV4 query-string presigned URL for an object in the bucket.
+
+        The client must send the given headers unchanged; params (e.g. x-amz-meta-*) go in the query string.
+        """
+        # The client's own credentials: the env key pair, or temporary ones (session token,
+        # role or instance profile) from boto3's credential chain, refreshed when they expire
+        credentials = self.s3_client._request_signer._credentials
+        if credentials is None:
+            raise ValueError("No AWS credentials available to sign the URL")
+        credentials = credentials.get_frozen_credentials()
+
+        amz_date = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        path = quote(f"{self._path_prefix}{key}", safe='/')
+
+        signed_headers = {name.lower(): value.strip() for name, value in headers.items()}
+        signed_headers['host'] = self._host
+        header_names = ';'.join(sorted(signed_headers))
+
+        query = {
+            **params,
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f"{credentials.access_key}/{scope}",
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires_in),
+            'X-Amz-SignedHeaders': header_names,
+        }
+        if credentials.token:
+            query['X-Amz-Security-Token'] = credentials.token
+        encoded_query = sorted((quote(name, safe=''), quote(value, safe='')) for name, value in query.items())
+        canonical_query = '&'.join(f"{name}={value}" for name, value in encoded_query)
+
+        canonical_request = '\n'.join((
+            method,
+            path,
+            canonical_query,
+            ''.join(f"{name}:{signed_headers[name]}\n" for name in sorted(signed_headers)),
+            header_names,
+            'UNSIGNED-PAYLOAD',
+        ))
+        string_to_sign = '\n'.join((
+            'AWS4-HMAC-SHA256',
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+        ))
+        signature = hmac.new(self._signing_key(credentials.secret_key, amz_date[:8]), string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+        return f"https://{self._host}{path}?{canonical_query}&X-Amz-Signature={signature}"
     
-    async def upload_file(self, file_data: bytes, file_name: str, content_type: str) -> S3UploadResult:
-        """Upload a file to S3"""
+    async def upload_file(self, file_obj: BinaryIO, file_name: str, content_type: str, file_size: int) -> S3UploadResult:
+        """Upload a file-like object to S3, streaming it in multipart chunks"""
         timestamp = int(time.time() * 1000)
-        sanitized_name = "".join(c if c.isalnum() or c in ".-_" else "_" for c in file_name)
-        key = f"{self.key_prefix}{timestamp}_{sanitized_name}"
+        key = self._object_key(file_name)
         
         try:
-            response = self.s3_client.put_object(
-                Bucket=self.bucket,
-                Key=key,
-                Body=file_data,
-                ContentType=content_type,
-                Metadata={
-                    'originalName': file_name,
-                    'fileSize': str(len(file_data)),
-                    'uploadTimestamp': str(timestamp)
-                }
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
+                file_obj,
+                self.bucket,
+                key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'Metadata': {
+                        'originalName': file_name,
+                        'fileSize': str(file_size),
+                        'uploadTimestamp': str(timestamp)
+                    }
+                },
+                Config=UPLOAD_TRANSFER_CONFIG
             )
+            # upload_fileobj doesn't return the object's ETag
+            response = await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket, Key=key)
             
             return S3UploadResult(
                 key=key,
@@ -67,56 +217,93 @@ class S3MultipartUpload:
                 etag=response['ETag'].strip('"')
             )
         except Exception as e:
-            logger.error(f"S3 upload failed: {e}")
+            logger.error("S3 upload failed: %s", e)
             raise Exception(f"Failed to upload file to S3: {str(e)}")
     
     async def get_presigned_upload_url(self, file_name: str, file_type: str, file_size: int) -> Dict[str, Any]:
         """Generate a presigned URL for direct client-side upload"""
         timestamp = int(time.time() * 1000)
-        sanitized_name = "".join(c if c.isalnum() or c in ".-_" else "_" for c in file_name)
-        key = f"{self.key_prefix}{timestamp}_{sanitized_name}"
+        key = self._object_key(file_name)
         
         try:
-            logger.info(f"Generating presigned PUT URL for: {file_name}, type: {file_type}, size: {file_size}")
+            logger.info("Generating presigned PUT URL for: %s, type: %s, size: %s", file_name, file_type, file_size)
             
             # Generate presigned URL for PUT operation
-            upload_url = self.s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': self.bucket,
-                    'Key': key,
-                    'ContentType': file_type,
-                    'Metadata': {
-                        'original-name': file_name,
-                        'file-size': str(file_size),
-                        'upload-timestamp': str(timestamp)
-                    }
+            upload_url = self._presign_url(
+                'PUT',
+                key,
+                headers={'Content-Type': file_type},
+                params={
+                    'x-amz-meta-original-name': file_name,
+                    'x-amz-meta-file-size': str(file_size),
+                    'x-amz-meta-upload-timestamp': str(timestamp)
                 },
-                ExpiresIn=3600  # 1 hour
+                expires_in=3600  # 1 hour
             )
             
-            logger.info(f"Generated presigned PUT URL successfully for key: {key}")
+            logger.info("Generated presigned PUT URL successfully for key: %s", key)
             
             return {
                 'uploadUrl': upload_url,
                 'key': key
             }
         except Exception as e:
-            logger.error(f"Failed to generate presigned PUT URL: {e}")
+            logger.error("Failed to generate presigned PUT URL: %s", e)
             raise Exception(f"Failed to generate upload URL: {str(e)}")
     
+    def get_direct_upload_params(self, file_name: str, file_type: str, expires_in: int = 3600) -> Dict[str, str]:
+        """Key and signed query parameters for a small file uploaded through the backend instead of a presigned URL"""
+        key = self._object_key(file_name)
+        expires = str(int(time.time()) + expires_in)
+        return {
+            'key': key,
+            'expires': expires,
+            'token': self._direct_upload_token(key, file_type, expires)
+        }
+
+    def _direct_upload_token(self, key: str, content_type: str, expires: str) -> str:
+        token_key = f"direct-upload:{self.secret_access_key}".encode('utf-8')
+        return hmac.new(token_key, f"{key}\n{content_type}\n{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def verify_direct_upload(self, key: str, content_type: str, expires: str, token: str) -> bool:
+        """Check that a direct upload matches parameters issued by get_direct_upload_params and hasn't expired"""
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(token, self._direct_upload_token(key, content_type, expires))
+
+    async def put_file(self, key: str, body: bytes, content_type: str) -> S3UploadResult:
+        """Upload a small in-memory file to S3 with a single PUT"""
+        try:
+            response = await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                Metadata={'fileSize': str(len(body))}
+            )
+            return S3UploadResult(
+                key=key,
+                location=f"https://{self.bucket}.s3.amazonaws.com/{key}",
+                bucket=self.bucket,
+                etag=response['ETag'].strip('"')
+            )
+        except Exception as e:
+            logger.error("S3 upload failed: %s", e)
+            raise Exception(f"Failed to upload file to S3: {str(e)}")
+
     async def delete_file(self, key: str) -> None:
         """Delete a file from S3"""
         try:
-            self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+            await asyncio.to_thread(self.s3_client.delete_object, Bucket=self.bucket, Key=key)
         except Exception as e:
-            logger.error(f"Failed to delete file from S3: {e}")
+            logger.error("Failed to delete file from S3: %s", e)
             raise Exception(f"Failed to delete file: {str(e)}")
     
     async def get_file_info(self, key: str) -> Dict[str, Any]:
         """Get file metadata and check if it exists"""
         try:
-            response = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+            response = await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket, Key=key)
             return {
                 'exists': True,
                 'size': response.get('ContentLength'),
@@ -131,18 +318,65 @@ class S3MultipartUpload:
     async def download_file(self, key: str) -> Dict[str, Any]:
         """Download a file from S3"""
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+            response = await asyncio.to_thread(self.s3_client.get_object, Bucket=self.bucket, Key=key)
             return {
-                'buffer': response['Body'].read(),
+                'buffer': await asyncio.to_thread(response['Body'].read),
                 'contentType': response.get('ContentType'),
                 'contentLength': response.get('ContentLength')
             }
         except Exception as e:
-            logger.error(f"Failed to download file from S3: {e}")
+            logger.error("Failed to download file from S3: %s", e)
+            raise Exception(f"Failed to download file: {str(e)}")
+
+    async def stream_file(self, key: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+        """Open a file in S3 for download as a stream of fixed-size chunks.
+
+        Iterating 'chunks' to the end closes 'body'; callers that may stop before
+        iterating must close 'body' themselves.
+        """
+        try:
+            response = await asyncio.to_thread(self.s3_client.get_object, Bucket=self.bucket, Key=key)
+        except Exception as e:
+            logger.error("Failed to download file from S3: %s", e)
             raise Exception(f"Failed to download file: {str(e)}")
 
+        return {
+            'body': response['Body'],
+            'chunks': self._iter_chunks(response['Body'], chunk_size),
+            'contentType': response.get('ContentType'),
+            'contentLength': response.get('ContentLength')
+        }
+
+    async def _iter_chunks(self, body, chunk_size: int) -> AsyncIterator[memoryview]:
+        """Yield chunks of exactly chunk_size bytes (except the last) from a boto3 response body.
+
+        Chunks are views into one reused buffer, which is refilled when the next chunk is
+        requested - consume (or copy) each chunk before asking for another.
+        """
+        pooled = chunk_size == chunk_buffers.chunk_size
+        buffer = await chunk_buffers.acquire() if pooled else bytearray(chunk_size)
+        view = memoryview(buffer)
+        filled = 0
+        try:
+            while True:
+                data = await asyncio.to_thread(body.read, chunk_size - filled)
+                if not data:
+                    break
+                view[filled:filled + len(data)] = data
+                filled += len(data)
+                if filled == chunk_size:
+                    yield view
+                    filled = 0
+            if filled:
+                yield view[:filled]
+        finally:
+            body.close()
+            if pooled:
+                chunk_buffers.release(buffer)
+
+@lru_cache(maxsize=1)
 def validate_aws_config() -> Dict[str, Any]:
-    """Validate AWS configuration"""
+    """Validate AWS configuration - environment variables don't change, so this runs once per process"""
     required_vars = [
         'AWS_ACCESS_KEY_ID',
         'AWS_SECRET_ACCESS_KEY', 
@@ -157,6 +391,6 @@ def validate_aws_config() -> Dict[str, Any]:
         'missing': missing
     }
 
-# Create default instances
+# Create default instance - presigning, uploads and downloads share one boto3 client
 s3_upload = S3MultipartUpload()
-s3_downloader = S3MultipartUpload()  # For downloading files 
\ No newline at end of file
+s3_downloader = s3_upload
@@ -0,0 +1,72 @@
+import google.generativeai as genai
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Dict
+
+from lib.text_utils import strip_meta_prefixes
+from lib.youtube_utils import create_chunk_section_prompt, split_chunk_sections, merge_chunk_sections
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "gemini-2.0-flash-001"
+
+# Configure Gemini AI once per process
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+else:
+    logger.warning("GEMINI_API_KEY not found in environment variables")
+
+# Shared summarization model, reused across requests
+summary_model = genai.GenerativeModel(SUMMARY_MODEL)
+
+# Upper bound on in-flight Gemini chunk requests, shared by every endpoint in the process for rate-limit safety
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+# Transcript chunks packed into each Gemini request for multi-chunk summaries
+CHUNKS_PER_REQUEST = int(os.getenv('GEMINI_CHUNKS_PER_REQUEST', '4'))
+
+# Polish multi-chunk summaries with one more Gemini call instead of only stitching them locally
+SUMMARY_REDUCE_WITH_LLM = os.getenv('SUMMARY_REDUCE_WITH_LLM', '').lower() in ('1', 'true', 'yes')
+
+def get_gemini_client() -> genai.GenerativeModel:
+    """Return the shared summarization model, or fail if Gemini is not configured"""
+    if not GEMINI_API_KEY:
+        raise ValueError('Gemini API key is not configured. Please add your API key in the environment variables.')
+    return summary_model
+
+async def summarize_chunk_batches(model: genai.GenerativeModel, chunks: list, language: str,
+                                  progress_start: int, progress_span: int) -> AsyncIterator[Dict[str, Any]]:
+    """Summarize transcript chunks in concurrent batches.
+
+    Yields a progress event as each batch lands, then one 'sections' event whose
+    content is the merged per-chunk summary.
+    """
+    batches = [chunks[i:i + CHUNKS_PER_REQUEST] for i in range(0, len(chunks), CHUNKS_PER_REQUEST)]
+
+    async def summarize_batch(index: int, batch: list):
+        prompt = create_chunk_section_prompt(batch, index * CHUNKS_PER_REQUEST, len(chunks), language)
+        async with gemini_semaphore:
+            response = await model.generate_content_async(prompt)
+        return index, split_chunk_sections(strip_meta_prefixes(response.text))
+
+    batch_summaries = [[] for _ in batches]
+    tasks = [asyncio.create_task(summarize_batch(i, batch)) for i, batch in enumerate(batches)]
+    try:
+        for done, next_summary in enumerate(asyncio.as_completed(tasks), start=1):
+            index, sections = await next_summary
+            batch_summaries[index] = sections
+            yield {
+                'type': 'progress',
+                'message': f'Processed chunk batch {done} of {len(batches)}...',
+                'progress': progress_start + (done * progress_span // len(batches))
+            }
+    finally:
+        # Don't leave batches running if one fails or the client disconnects
+        for task in tasks:
+            task.cancel()
+
+    chunk_summaries = [section for sections in batch_summaries for section in sections]
+    yield {'type': 'sections', 'content': merge_chunk_sections(chunk_summaries, language)}
@@ -1,26 +1,38 @@
 import google.generativeai as genai
 import aiohttp
+import httpx
 import asyncio
 import os
 import json
+import random
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Optional, Union
 from dataclasses import dataclass
-from dotenv import load_dotenv
 import ssl
 
-# Load environment variables from .env file
-load_dotenv()
+from lib.gemini import summary_model
+from lib.text_utils import strip_first_line_meta_prefixes
 
 logger = logging.getLogger(__name__)
 
-# Create SSL context that can handle certificate verification issues
-def create_ssl_context():
-    """Create SSL context with proper certificate handling"""
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-    return ssl_context
+GOOGLE_API_BASE = "https://generativelanguage.googleapis.com"
+
+# One verifying TLS context for every Google API connection, built once so the CA bundle
+# is loaded a single time and TLS sessions can be resumed across connections
+SSL_CONTEXT = ssl.create_default_context()
+
+# Section markers separating the transcript and summary in a single Gemini response
+TRANSCRIPT_MARKER = "===TRANSCRIPT==="
+SUMMARY_MARKER = "===SUMMARY==="
+
+# Appended to a transcript that still hit the output token limit when requested on its own,
+# so chat and history never present it as complete
+TRANSCRIPT_TRUNCATED_NOTE = "\n\n[Transcript truncated: the video is too long for a complete transcript]"
+
+# File status polling: first check after 0.5s, growing 1.5x per poll up to 10s
+POLL_INITIAL_INTERVAL = 0.5
+POLL_BACKOFF_FACTOR = 1.5
+POLL_MAX_INTERVAL = 10
 
 @dataclass
 class GoogleFileUploadResult:
@@ -42,193 +54,168 @@ class GoogleFilesProcessor:
         if not api_key:
             raise ValueError('Gemini API key is not configured. Please add GEMINI_API_KEY to environment variables.')
         self.api_key = api_key
-        genai.configure(api_key=api_key)
-
-    def clean_model_output(self, text: str) -> str:
-        """Clean model outputs to remove meta-commentary"""
-        import re
-        text = re.sub(r'^(Okay|Here\'?s?( is)?|Let me|I will|I\'ll|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly|Alright).*?,\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^(Here\'?s?( is)?|I\'?ll?|Let me|I will|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly).*?(summary|translate|breakdown|analysis).*?:\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^(Based on|According to).*?,\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^I understand.*?[.!]\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^(Now|First|Let\'s),?\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^(Here are|The following is|This is|Below is).*?:\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^(I\'ll provide|Let me break|I\'ll break|I\'ll help|I\'ve structured).*?:\s*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'^(As requested|Following your|In response to).*?:\s*', '', text, flags=re.IGNORECASE)
-        return text.strip()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._api_client: Optional[httpx.AsyncClient] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared session so uploads reuse pooled TLS connections"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=SSL_CONTEXT,
+                limit=100,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _get_api_client(self) -> httpx.AsyncClient:
+        """HTTP/2 client for small metadata requests - status polls for every in-flight
+        upload are multiplexed over one connection instead of one connection each"""
+        if self._api_client is None or self._api_client.is_closed:
+            self._api_client = httpx.AsyncClient(
+                base_url=GOOGLE_API_BASE,
+                http2=True,
+                verify=SSL_CONTEXT,
+                limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60)
+            )
+        return self._api_client
+
+    async def close(self) -> None:
+        """Close pooled connections on shutdown"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._api_client is not None:
+            await self._api_client.aclose()
+            self._api_client = None
 
     async def upload_to_google_files(self, file_buffer: bytes, file_name: str, mime_type: str) -> GoogleFileUploadResult:
         """Upload file to Google Files API using resumable upload"""
-        logger.info(f"Uploading file to Google Files API: {file_name}")
+        logger.info("Uploading file to Google Files API: %s", file_name)
 
         try:
-            # Step 1: Initiate resumable upload
-            metadata = {
-                "file": {
-                    "display_name": file_name,
-                },
-            }
-
-            logger.info("Starting resumable upload session", {
-                "fileName": file_name,
-                "fileSize": len(file_buffer),
-                "mimeType": mime_type
-            })
-
-            # Create SSL context and connector
-            ssl_context = create_ssl_context()
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            
-            async with aiohttp.ClientSession(connector=connector) as session:
-                # Step 1: Initiate upload
-                init_url = f"https://generativelanguage.googleapis.com/upload/v1beta/files?key={self.api_key}"
-                init_headers = {
-                    'X-Goog-Upload-Protocol': 'resumable',
-                    'X-Goog-Upload-Command': 'start',
-                    'X-Goog-Upload-Header-Content-Length': str(len(file_buffer)),
-                    'X-Goog-Upload-Header-Content-Type': mime_type,
-                    'Content-Type': 'application/json',
-                }
-
-                async with session.post(init_url, headers=init_headers, json=metadata) as init_response:
-                    if not init_response.ok:
-                        error_text = await init_response.text()
-                        logger.error('Failed to initiate resumable upload', {
-                            'status': init_response.status,
-                            'error': error_text
-                        })
-                        raise Exception(f"Failed to initiate upload: {init_response.status} - {error_text}")
-
-                    # Step 2: Get upload URL from response headers
-                    upload_url = init_response.headers.get('x-goog-upload-url')
-                    if not upload_url:
-                        raise Exception('No upload URL received from Google Files API')
-
-                    logger.info('Upload session initiated, uploading file data', {'uploadUrl': upload_url})
-
-                # Step 3: Upload the actual file data
-                upload_headers = {
-                    'Content-Length': str(len(file_buffer)),
-                    'X-Goog-Upload-Offset': '0',
-                    'X-Goog-Upload-Command': 'upload, finalize',
-                }
-
-                async with session.post(upload_url, headers=upload_headers, data=file_buffer) as upload_response:
-                    if not upload_response.ok:
-                        error_text = await upload_response.text()
-                        logger.error('Failed to upload file data', {
-                            'status': upload_response.status,
-                            'error': error_text
-                        })
-                        raise Exception(f"Failed to upload file data: {upload_response.status} - {error_text}")
-
-                    result = await upload_response.json()
-                    logger.info('File uploaded successfully to Google Files API', result)
-
-                    # Check if the response has the expected structure
-                    if not result.get('file') or not result['file'].get('name') or not result['file'].get('uri'):
-                        logger.error('Unexpected upload response format', result)
-                        raise Exception('Google Files API returned unexpected response format')
-
-                    return GoogleFileUploadResult(
-                        file_uri=result['file']['uri'],
-                        name=result['file']['name'],
-                        mime_type=result['file']['mimeType'],
-                        size_bytes=result['file']['sizeBytes'],
-                        state=result['file']['state'],
-                    )
+            upload_url = await self.start_resumable_upload(len(file_buffer), file_name, mime_type)
+            return await self.upload_chunk(upload_url, file_buffer, 0, finalize=True)
         except Exception as e:
-            logger.error(f'Failed to upload to Google Files API: {str(e)}')
+            logger.error('Failed to upload to Google Files API: %s', e)
             raise Exception(f"Failed to upload to Google Files API: {str(e)}")
 
+    async def start_resumable_upload(self, file_size: int, file_name: str, mime_type: str) -> str:
+        """Start a resumable upload session and return its upload URL"""
+        metadata = {
+            "file": {
+                "display_name": file_name,
+            },
+        }
+
+        logger.info("Starting resumable upload session: fileName=%s fileSize=%d mimeType=%s", file_name, file_size, mime_type)
+
+        init_url = f"{GOOGLE_API_BASE}/upload/v1beta/files?key={self.api_key}"
+        init_headers = {
+            'X-Goog-Upload-Protocol': 'resumable',
+            'X-Goog-Upload-Command': 'start',
+            'X-Goog-Upload-Header-Content-Length': str(file_size),
+            'X-Goog-Upload-Header-Content-Type': mime_type,
+            'Content-Type': 'application/json',
+        }
+
+        async with self._get_session().post(init_url, headers=init_headers, json=metadata) as init_response:
+            if not init_response.ok:
+                error_text = await init_response.text()
+                logger.error('Failed to initiate resumable upload: status=%s error=%s', init_response.status, error_text)
+                raise Exception(f"Failed to initiate upload: {init_response.status} - {error_text}")
+
+            # Get upload URL from response headers
+            upload_url = init_response.headers.get('x-goog-upload-url')
+            if not upload_url:
+                raise Exception('No upload URL received from Google Files API')
+
+            logger.info('Upload session initiated, uploading file data')
+            return upload_url
+
+    async def upload_chunk(self, upload_url: str, chunk: Union[bytes, memoryview], offset: int, finalize: bool = False) -> Optional[GoogleFileUploadResult]:
+        """Upload one chunk of a resumable upload; returns the file once the upload is finalized.
+
+        Every chunk except the last must be a multiple of 256 KiB.
+        """
+        upload_headers = {
+            'Content-Length': str(len(chunk)),
+            'X-Goog-Upload-Offset': str(offset),
+            'X-Goog-Upload-Command': 'upload, finalize' if finalize else 'upload',
+        }
+
+        async with self._get_session().post(upload_url, headers=upload_headers, data=chunk) as upload_response:
+            if not upload_response.ok:
+                error_text = await upload_response.text()
+                logger.error('Failed to upload file data: status=%s error=%s', upload_response.status, error_text)
+                raise Exception(f"Failed to upload file data: {upload_response.status} - {error_text}")
+
+            if not finalize:
+                return None
+
+            result = await upload_response.json()
+            logger.info('File uploaded successfully to Google Files API')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Upload result: %s', result)
+
+            # Check if the response has the expected structure
+            if not result.get('file') or not result['file'].get('name') or not result['file'].get('uri'):
+                logger.error('Unexpected upload response format: %s', result)
+                raise Exception('Google Files API returned unexpected response format')
+
+            return GoogleFileUploadResult(
+                file_uri=result['file']['uri'],
+                name=result['file']['name'],
+                mime_type=result['file']['mimeType'],
+                size_bytes=result['file']['sizeBytes'],
+                state=result['file']['state'],
+            )
+
     async def wait_for_file_processing(self, file_name: str, max_wait_time: int = 300000) -> bool:
         """Wait for file processing to complete"""
-        logger.info(f"Waiting for file processing: {file_name}")
+        logger.info("Waiting for file processing: %s", file_name)
 
-        start_time = asyncio.get_event_loop().time()
-        poll_interval = 5  # 5 seconds
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        poll_interval = POLL_INITIAL_INTERVAL
 
-        while (asyncio.get_event_loop().time() - start_time) * 1000 < max_wait_time:
+        while (loop.time() - start_time) * 1000 < max_wait_time:
             try:
-                # Create SSL context and connector
-                ssl_context = create_ssl_context()
-                connector = aiohttp.TCPConnector(ssl=ssl_context)
-                
-                async with aiohttp.ClientSession(connector=connector) as session:
-                    url = f"https://generativelanguage.googleapis.com/v1beta/{file_name}?key={self.api_key}"
-                    async with session.get(url) as response:
-                        if not response.ok:
-                            error_text = await response.text()
-                            logger.error('Failed to check file status', {
-                                'status': response.status,
-                                'statusText': response.reason,
-                                'error': error_text
-                            })
-                            raise Exception(f"Failed to check file status: {response.status} - {error_text}")
-
-                        file_info = await response.json()
-                        logger.info('File processing status', {
-                            'state': file_info.get('state'),
-                            'name': file_info.get('name'),
-                            'mimeType': file_info.get('mimeType')
-                        })
-
-                        if file_info.get('state') == 'ACTIVE':
-                            logger.info('File processing completed successfully')
-                            return True
-                        elif file_info.get('state') == 'FAILED':
-                            raise Exception('File processing failed on Google servers')
-
-                        logger.info(f"File state: {file_info.get('state')}, waiting {poll_interval}s before next check...")
-
-                        # Wait before next poll
-                        await asyncio.sleep(poll_interval)
+                response = await self._get_api_client().get(f"/v1beta/{file_name}", params={'key': self.api_key})
+                if not response.is_success:
+                    logger.error('Failed to check file status: status=%s %s error=%s', response.status_code, response.reason_phrase, response.text)
+                    raise Exception(f"Failed to check file status: {response.status_code} - {response.text}")
+
+                file_info = response.json()
+                logger.info('File processing status: state=%s name=%s', file_info.get('state'), file_info.get('name'))
+
+                if file_info.get('state') == 'ACTIVE':
+                    logger.info('File processing completed successfully')
+                    return True
+                elif file_info.get('state') == 'FAILED':
+                    raise Exception('File processing failed on Google servers')
+
+                logger.info("File state: %s, waiting %.1fs before next check...", file_info.get('state'), poll_interval)
+
+                # Wait before next poll, backing off so short videos finish fast and long ones aren't hammered
+                await asyncio.sleep(poll_interval + random.uniform(0, poll_interval * 0.1))
+                poll_interval = min(poll_interval * POLL_BACKOFF_FACTOR, POLL_MAX_INTERVAL)
             except Exception as e:
-                logger.error(f'Error checking file processing status: {str(e)}')
+                logger.error('Error checking file processing status: %s', e)
                 raise e
 
         raise Exception(f"File processing timeout after {max_wait_time / 1000} seconds")
 
     async def process_video_with_gemini(self, file_uri: str, google_file_name: str, mime_type: str) -> VideoProcessingResult:
         """Generate transcript and summary using Gemini"""
-        logger.info(f"Processing video with Gemini: {google_file_name}")
+        logger.info("Processing video with Gemini: %s", google_file_name)
 
         try:
-            model = genai.GenerativeModel("gemini-2.0-flash-001")
-
             # Get the file object first
-            file_obj = genai.get_file(google_file_name)
-
-            # First, get the transcript
-            transcript_prompt = f"""
-            Please provide a complete transcript of all spoken content in this video with timestamps. 
-            Include only the actual words spoken, without any commentary or analysis.
-            Format it as a clean, readable transcript with timestamps in [MM:SS] or [HH:MM:SS] format at the beginning of each segment.
-            
-            Example format:
-            [00:00] Opening words of the video...
-            [00:15] Next segment of speech...
-            [01:30] Another segment...
-            
-            Provide the complete timestamped transcript with proper punctuation and paragraph breaks.
-            """
-
-            transcript_response = model.generate_content([
-                file_obj,
-                transcript_prompt
-            ])
-
-            transcript_text = transcript_response.text.strip()
-
-            # Then create the summary
-            summary_prompt = f"""
-            You are an expert content summarizer. Create a comprehensive summary of this video content. Do not include any meta-commentary, introductions, or instructions in your response - provide only the summary content.
-
-            Video Information:
-            - File Name: {google_file_name}
-            - MIME Type: {mime_type}
+            file_obj = await asyncio.to_thread(genai.get_file, google_file_name)
 
-            Format your response exactly as follows:
+            summary_instructions = """Create a comprehensive summary of the video content, formatted exactly as follows:
 
             🎯 **TITLE:** [Extract or create a compelling title for the video]
 
@@ -252,22 +239,79 @@ class GoogleFilesProcessor:
 
             ⏱️ **DURATION:** [Estimated video duration if mentioned or observable]
 
-            🏷️ **TAGS:** [Relevant tags or categories for the video content]
+            🏷️ **TAGS:** [Relevant tags or categories for the video content]"""
+
+            video_info = f"""Video Information:
+            - File Name: {google_file_name}
+            - MIME Type: {mime_type}"""
+
+            transcript_instructions = """Provide a complete transcript of all spoken content in this video with timestamps.
+            Include only the actual words spoken, without any commentary or analysis.
+            Format it as a clean, readable transcript with timestamps in [MM:SS] or [HH:MM:SS] format at the beginning of each segment.
+
+            Example format:
+            [00:00] Opening words of the video...
+            [00:15] Next segment of speech...
+            [01:30] Another segment...
+
+            Provide the complete timestamped transcript with proper punctuation and paragraph breaks."""
+
+            # Ask for the summary and the transcript in one response, so the video is only processed once.
+            # The summary comes first: if the output limit is hit, it's the long transcript that gets cut
+            video_prompt = f"""
+            You are an expert content summarizer. Watch this video and produce two sections, each starting with its marker line exactly as shown. Do not include any meta-commentary, introductions, or instructions in your response.
+
+            {video_info}
+
+            {SUMMARY_MARKER}
+            {summary_instructions}
+
+            {TRANSCRIPT_MARKER}
+            {transcript_instructions}
             """
 
-            # Process the video file using the uploaded file            
-            summary_response = model.generate_content([
+            response = await summary_model.generate_content_async([
                 file_obj,
-                summary_prompt
+                video_prompt
             ])
 
-            summary_text = summary_response.text.strip()
-            logger.info('Received summary response from Gemini', {'summaryLength': len(summary_text)})
-            logger.info('Received transcript from Gemini', {'transcriptLength': len(transcript_text)})
+            response_text = response.text.strip()
+            sections = self.parse_gemini_response(response_text)
+
+            if self.hit_token_limit(response):
+                # The transcript is cut either way; the summary too if its end marker never arrived
+                retry_prompts = {'transcript': f"""
+            You are an expert transcriber. Do not include any meta-commentary, introductions, or instructions in your response - provide only the transcript.
+
+            {video_info}
+
+            {transcript_instructions}
+            """}
+                if TRANSCRIPT_MARKER not in response_text:
+                    retry_prompts['summary'] = f"""
+            You are an expert content summarizer. Create a comprehensive summary of this video content. Do not include any meta-commentary, introductions, or instructions in your response - provide only the summary content.
+
+            {video_info}
+
+            {summary_instructions}
+            """
+                logger.warning('Gemini response hit the output token limit, requesting the %s separately', ' and '.join(retry_prompts))
+                retry_responses = await asyncio.gather(*(
+                    summary_model.generate_content_async([file_obj, prompt]) for prompt in retry_prompts.values()
+                ))
+                for name, retry_response in zip(retry_prompts, retry_responses):
+                    sections[name] = retry_response.text.strip()
+                    if self.hit_token_limit(retry_response):
+                        logger.warning('Gemini %s hit the output token limit on its own and is truncated', name)
+                        if name == 'transcript':
+                            sections[name] += TRANSCRIPT_TRUNCATED_NOTE
+
+            logger.info('Received transcript and summary from Gemini: transcriptLength=%d summaryLength=%d',
+                        len(sections['transcript']), len(sections['summary']))
 
             # Clean the response text
-            summary_content = self.clean_model_output(summary_text)
-            transcript_content = self.clean_model_output(transcript_text)
+            summary_content = strip_first_line_meta_prefixes(sections['summary'])
+            transcript_content = strip_first_line_meta_prefixes(sections['transcript'])
 
             return VideoProcessingResult(
                 transcript=transcript_content,
@@ -275,13 +319,25 @@ class GoogleFilesProcessor:
             )
 
         except Exception as e:
-            logger.error(f'Failed to process video with Gemini: {str(e)}')
+            logger.error('Failed to process video with Gemini: %s', e)
             raise Exception(f"Failed to process video with Gemini: {str(e)}")
 
+    def hit_token_limit(self, response) -> bool:
+        """Whether a Gemini response stopped because it reached the output token limit"""
+        return bool(response.candidates) and response.candidates[0].finish_reason == genai.protos.Candidate.FinishReason.MAX_TOKENS
+
     def parse_gemini_response(self, text: str) -> Dict[str, str]:
         """Parse Gemini response to extract transcript and summary"""
         try:
-            # Try to parse as JSON first
+            # Responses to the combined prompt carry explicit section markers
+            if SUMMARY_MARKER in text:
+                summary, _, transcript = text.partition(SUMMARY_MARKER)[2].partition(TRANSCRIPT_MARKER)
+                summary = summary.strip()
+                transcript = transcript.strip()
+                if transcript and summary:
+                    return {'transcript': transcript, 'summary': summary}
+
+            # Otherwise try to parse as JSON
             if text.startswith('{') and text.endswith('}'):
                 result = json.loads(text)
                 if 'transcript' in result and 'summary' in result:
@@ -322,7 +378,7 @@ class GoogleFilesProcessor:
             }
 
         except Exception as e:
-            logger.error(f'Failed to parse Gemini response: {str(e)}')
+            logger.error('Failed to parse Gemini response: %s', e)
             # Return entire text as summary if parsing fails
             return {
                 'transcript': 'Transcript extraction failed during processing.',
@@ -331,27 +387,17 @@ class GoogleFilesProcessor:
 
     async def delete_google_file(self, file_name: str) -> None:
         """Delete a file from Google Files API"""
-        logger.info(f"Deleting Google file: {file_name}")
+        logger.info("Deleting Google file: %s", file_name)
 
         try:
-            # Create SSL context and connector
-            ssl_context = create_ssl_context()
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            
-            async with aiohttp.ClientSession(connector=connector) as session:
-                url = f"https://generativelanguage.googleapis.com/v1beta/{file_name}?key={self.api_key}"
-                async with session.delete(url) as response:
-                    if response.ok:
-                        logger.info('File deleted successfully from Google Files API')
-                    else:
-                        error_text = await response.text()
-                        logger.error('Failed to delete file from Google Files API', {
-                            'status': response.status,
-                            'error': error_text
-                        })
-                        # Don't raise exception for delete failures to avoid breaking the main flow
+            response = await self._get_api_client().delete(f"/v1beta/{file_name}", params={'key': self.api_key})
+            if response.is_success:
+                logger.info('File deleted successfully from Google Files API')
+            else:
+                logger.error('Failed to delete file from Google Files API: status=%s error=%s', response.status_code, response.text)
+                # Don't raise exception for delete failures to avoid breaking the main flow
         except Exception as e:
-            logger.error(f'Error deleting file from Google Files API: {str(e)}')
+            logger.error('Error deleting file from Google Files API: %s', e)
             # Don't raise exception for delete failures
 
     async def process_video(self, file_buffer: bytes, file_name: str, mime_type: str) -> VideoProcessingResult:
@@ -1,16 +1,51 @@
 from supabase import create_client, Client
+from postgrest import ReturnMethod
+import httpx
+import asyncio
 import os
+import re
+import uuid
 from typing import Dict, Any, Optional
-from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
 
 # Supabase configuration
 supabase_url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
 supabase_key = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
 
+# Connection pool for PostgREST requests - keeps TLS connections alive between calls
+DB_POOL_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40, keepalive_expiry=30.0)
+
+def use_pooled_session(client: Client) -> None:
+    """Replace the default PostgREST session with a bounded keep-alive pool.
+
+    Everything else matches the session postgrest creates: HTTP/2, redirects, and the
+    client timeout (large transcript inserts need the full default).
+    """
+    default_session = client.postgrest.session
+    client.postgrest.session = httpx.Client(
+        base_url=default_session.base_url,
+        headers=default_session.headers,
+        timeout=default_session.timeout,
+        follow_redirects=default_session.follow_redirects,
+        http2=True,
+        limits=DB_POOL_LIMITS,
+    )
+    default_session.close()
+
+async def run_query(query):
+    """Execute a PostgREST query in a worker thread so it doesn't block the event loop"""
+    return await asyncio.to_thread(query.execute)
+
+async def insert_summary(row: Dict[str, Any]) -> str:
+    """Insert a summary and return its id without having the row echoed back"""
+    summary_id = str(uuid.uuid4())
+    await run_query(supabase.table('summaries').insert({'id': summary_id, **row}, returning=ReturnMethod.minimal))
+    return summary_id
+
+def close_supabase() -> None:
+    """Close pooled database connections on shutdown"""
+    if supabase:
+        supabase.postgrest.session.close()
+
 # Initialize Supabase client with error handling
 supabase: Optional[Client] = None
 
@@ -19,6 +54,7 @@ try:
         # Only create client if we have valid-looking URLs and keys
         if supabase_url.startswith('http') and len(supabase_key) > 20:
             supabase = create_client(supabase_url, supabase_key)
+            use_pooled_session(supabase)
             print("✅ Supabase client initialized successfully")
         else:
             print("⚠️  Supabase configuration appears invalid - client not initialized")
@@ -43,28 +79,29 @@ class Summary:
         self.created_at = data.get('created_at')
         self.updated_at = data.get('updated_at')
 
+# Title lines written by the summary prompts (English and German)
+TITLE_PREFIXES = ('🎯 TITLE:', '🎯 TITEL:', '🎙️ TITLE:', '🎙️ TITEL:')
+EMOJI_PREFIX_RE = re.compile(r'^[🎯🎙️]\s*')
+
 def extract_title_from_content(content: str) -> str:
     """Extract title from summary content, similar to the TypeScript version"""
     try:
-        lines = content.split('\n')
-        # Look for title in different formats
-        for line in lines:
+        # Single pass: return the first non-empty title, remembering the first
+        # non-empty line as a fallback if no title marker is found
+        first_line = None
+        for line in content.splitlines():
             trimmed_line = line.strip()
-            if (trimmed_line.startswith('🎯 TITLE:') or 
-                trimmed_line.startswith('🎯 TITEL:') or
-                trimmed_line.startswith('🎙️ TITLE:') or
-                trimmed_line.startswith('🎙️ TITEL:')):
+            if not trimmed_line:
+                continue
+            if trimmed_line.startswith(TITLE_PREFIXES):
                 title = trimmed_line.split(':', 1)[1].strip()
                 if title:
                     return title
-        # Fallback: Use first non-empty line if no title marker found
-        for line in lines:
-            trimmed_line = line.strip()
-            if len(trimmed_line) > 0:
-                # Remove emoji prefixes
-                import re
-                title = re.sub(r'^[🎯🎙️]\s*', '', trimmed_line)
-                return title
+            if first_line is None:
+                first_line = trimmed_line
+        if first_line is not None:
+            # Remove emoji prefixes
+            return EMOJI_PREFIX_RE.sub('', first_line)
     except Exception as e:
         print(f"Error extracting title: {e}")
-    return 'Untitled Summary' 
\ No newline at end of file
+    return 'Untitled Summary'
@@ -0,0 +1,115 @@
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Pattern, Tuple
+
+# Leading meta-commentary the model tends to prepend ("Okay, here's the summary:"),
+# in English and German. Each pattern is anchored to the start of the text.
+_ENGLISH_PREFIX_SOURCES: Tuple[str, ...] = (
+    r'^(Okay|Here\'?s?( is)?|Let me|I will|I\'ll|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly|Alright)[\s\S]*?,\s*',
+    r'^(Here\'?s?( is)?|I\'?ll?|Let me|I will|I can|I would|I am going to|Allow me to|Sure|Of course|Certainly)[\s\S]*?(summary|translate|breakdown|analysis).*?:\s*',
+    r'^(Based on|According to).*?,\s*',
+    r'^I understand.*?[.!]\s*',
+    r'^(Now|First|Let\'s),?\s*',
+    r'^(Here are|The following is|This is|Below is).*?:\s*',
+    r'^(I\'ll provide|Let me break|I\'ll break|I\'ll help|I\'ve structured).*?:\s*',
+    r'^(As requested|Following your|In response to).*?:\s*',
+)
+
+_PREFIX_SOURCES: Tuple[str, ...] = _ENGLISH_PREFIX_SOURCES + (
+    # German prefixes
+    r'^(Okay|Hier( ist)?|Lass mich|Ich werde|Ich kann|Ich würde|Ich möchte|Erlauben Sie mir|Sicher|Natürlich|Gewiss|In Ordnung)[\s\S]*?,\s*',
+    r'^(Hier( ist)?|Ich werde|Lass mich|Ich kann|Ich würde|Ich möchte)[\s\S]*?(Zusammenfassung|Übersetzung|Analyse).*?:\s*',
+    r'^(Basierend auf|Laut|Gemäß).*?,\s*',
+    r'^Ich verstehe.*?[.!]\s*',
+    r'^(Jetzt|Zunächst|Lass uns),?\s*',
+    r'^(Hier sind|Folgendes|Dies ist|Im Folgenden).*?:\s*',
+    r'^(Ich werde|Lass mich|Ich helfe|Ich habe strukturiert).*?:\s*',
+    r'^(Wie gewünscht|Entsprechend Ihrer|Als Antwort auf).*?:\s*',
+)
+
+# One alternation per cascade position, covering that prefix and every later one. Each
+# alternative is a named group, so match.lastgroup tells which prefix was stripped and the
+# next match only tries the prefixes after it - the same result as applying each pattern
+# once, in order, with at most one regex call per stripped prefix
+_PREFIX_RES: Tuple[Pattern[str], ...] = tuple(
+    re.compile('|'.join(f'(?P<p{index}>{_PREFIX_SOURCES[index]})' for index in range(start, len(_PREFIX_SOURCES))), re.IGNORECASE)
+    for start in range(len(_PREFIX_SOURCES))
+)
+
+# The English prefixes confined to the first line, as the Google Files processor has always
+# applied them - its transcripts may open with a spoken "Okay, ..." that is real content
+_FIRST_LINE_PREFIX_RES: Tuple[Pattern[str], ...] = tuple(
+    re.compile(source.replace(r'[\s\S]*?', '.*?'), re.IGNORECASE) for source in _ENGLISH_PREFIX_SOURCES
+)
+
+# Responses that open with a section marker or markdown have no preamble to strip
+SECTION_START_MARKERS = ('🎯', '🎙', '📝', '🔑', '💡', '🔄', '⏱', '🏷', '#', '*', '-', '•')
+
+# Per-line meta instructions, stripped while preserving markdown and section emoji
+_META_LINE_PATTERNS: Tuple[Tuple[Pattern[str], str], ...] = (
+    (re.compile(r'^[^:\n🎯🎙️#*\-•]+:\s*', re.MULTILINE), ''),
+    (re.compile(r'^(?![#*\-•🎯️])[\s\d]+\.\s*', re.MULTILINE), ''),
+)
+
+
+def _strip_prefixes(text: str) -> str:
+    if text.lstrip().startswith(SECTION_START_MARKERS):
+        return text
+
+    # Strip stacked prefixes ("Okay, here's the summary:") in cascade order
+    start = 0
+    while start < len(_PREFIX_RES):
+        match = _PREFIX_RES[start].match(text)
+        if not match:
+            break
+        text = text[match.end():]
+        start = int(match.lastgroup[1:]) + 1
+    return text
+
+
+def strip_meta_prefixes(text: str) -> str:
+    """Remove leading meta-commentary from a model response"""
+    return _strip_prefixes(text).strip()
+
+
+def strip_first_line_meta_prefixes(text: str) -> str:
+    """Remove leading English meta-commentary, looking no further than the first line"""
+    for pattern in _FIRST_LINE_PREFIX_RES:
+        text = pattern.sub('', text)
+    return text.strip()
+
+
+def clean_model_output(text: str) -> str:
+    """Remove meta-commentary and stray instruction lines from a model response"""
+    text = _strip_prefixes(text)
+    for pattern, repl in _META_LINE_PATTERNS:
+        text = pattern.sub(repl, text)
+    return text.strip()
+
+
+def split_transcript_into_chunks(transcript: str, chunk_size: int = 7000, overlap: int = 1000) -> list:
+    words = transcript.split(' ')
+    # cumulative[k] is the length of the first k words, each counted with its joining space
+    cumulative = list(accumulate((len(word) + 1 for word in words), initial=0))
+    overlap_count = max(1, overlap // 10)
+
+    # Binary-search each chunk's end on the prefix sums; strings are only built at the end
+    spans = []
+    start = 0
+    end = 0
+    slack = 1  # chunks after the first are measured from their overlap, one space shorter
+
+    while True:
+        # First word that would push the chunk past chunk_size; a chunk always takes at least one word
+        end = max(bisect_right(cumulative, cumulative[start] + chunk_size + slack) - 1, start + 1, end + 1)
+        if end >= len(words):
+            break
+        spans.append((start, end))
+        # Keep last few words for overlap
+        start = max(start, end - overlap_count)
+        slack = 2
+
+    spans.append((start, len(words)))
+
+    return [' '.join(words[s:e]) for s, e in spans]
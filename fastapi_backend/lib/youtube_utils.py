@@ -1,53 +1,64 @@
 import re
-from typing import Dict, Any
+import string
+from types import MappingProxyType
+
+VIDEO_ID_LENGTH = 11
+VIDEO_ID_CHARS = frozenset(string.ascii_letters + string.digits + '_-')
+
+def _is_video_id(candidate: str) -> bool:
+    return len(candidate) == VIDEO_ID_LENGTH and VIDEO_ID_CHARS.issuperset(candidate)
 
 def extract_video_id(youtube_url: str) -> str:
     """Extract video ID from various YouTube URL formats"""
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',      # Standard and shared URLs
-        r'(?:embed\/)([0-9A-Za-z_-]{11})',       # Embed URLs
-        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})',   # Shortened URLs
-        r'(?:shorts\/)([0-9A-Za-z_-]{11})',      # YouTube Shorts
-        r'^([0-9A-Za-z_-]{11})$'                 # Just the video ID
-    ]
-
     url = youtube_url.strip()
 
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    # Bare IDs are common and need no scanning
+    if _is_video_id(url):
+        return url
+
+    # The ID is the first 11 ID characters right after a "v=" or any "/" (covers watch,
+    # embed, youtu.be and shorts URLs). Walk both markers left to right with str.find.
+    slash = url.find('/')
+    equals = url.find('v=')
+    while slash != -1 or equals != -1:
+        if equals != -1 and (slash == -1 or equals < slash):
+            start = equals + 2
+            equals = url.find('v=', equals + 1)
+        else:
+            start = slash + 1
+            slash = url.find('/', slash + 1)
+        candidate = url[start:start + VIDEO_ID_LENGTH]
+        if _is_video_id(candidate):
+            return candidate
 
     raise ValueError("Could not extract video ID from URL")
 
-AVAILABLE_LANGUAGES = {
+AVAILABLE_LANGUAGES = MappingProxyType({
     'English': 'en'
-}
-
-def create_summary_prompt(text: str, target_language: str) -> str:
-    """Create summary prompt for different languages with optional visual context"""
-    language_prompts = {
-        'en': {
-            'title': 'TITLE',
-            'overview': 'OVERVIEW',
-            'key_points': 'KEY POINTS',
-            'in_detail': 'IN DETAIL',
-            'takeaways': 'MAIN TAKEAWAYS',
-            'context': 'CONTEXT & IMPLICATIONS'
-        },
-        'de': {
-            'title': 'TITEL',
-            'overview': 'ÜBERBLICK',
-            'key_points': 'KERNPUNKTE',
-            'in_detail': 'IM DETAIL',
-            'takeaways': 'HAUPTERKENNTNISSE',
-            'context': 'KONTEXT & AUSWIRKUNGEN'
-        }
-    }
-
-    prompts = language_prompts.get(target_language, language_prompts['en'])
-
-    return f"""You are an expert content summarizer. Create a comprehensive summary of the following YouTube video content. Do not include any meta-commentary, introductions, or instructions in your response - provide only the summary content.
+})
+
+# Section headings used in generated summaries, per output language (read-only, shared by all requests)
+LANGUAGE_PROMPTS = MappingProxyType({
+    'en': MappingProxyType({
+        'title': 'TITLE',
+        'overview': 'OVERVIEW',
+        'key_points': 'KEY POINTS',
+        'in_detail': 'IN DETAIL',
+        'takeaways': 'MAIN TAKEAWAYS',
+        'context': 'CONTEXT & IMPLICATIONS'
+    }),
+    'de': MappingProxyType({
+        'title': 'TITEL',
+        'overview': 'ÜBERBLICK',
+        'key_points': 'KERNPUNKTE',
+        'in_detail': 'IM DETAIL',
+        'takeaways': 'HAUPTERKENNTNISSE',
+        'context': 'KONTEXT & AUSWIRKUNGEN'
+    })
+})
+
+# Full summary prompt; headings are filled in per language at import time
+SUMMARY_PROMPT_TEMPLATE = """You are an expert content summarizer. Create a comprehensive summary of the following YouTube video content. Do not include any meta-commentary, introductions, or instructions in your response - provide only the summary content.
 
 Content to summarize:
 {text}
@@ -56,30 +67,127 @@ IMPORTANT: Based on the video transcript, make reasonable inferences about what
 
 Format your response exactly as follows:
 
-🎯 {prompts['title']}: [Create a descriptive title based on the actual content]
+🎯 {title}: [Create a descriptive title based on the actual content]
 
-📝 {prompts['overview']}: [2-3 sentences providing brief context and main purpose]
+📝 {overview}: [2-3 sentences providing brief context and main purpose]
 
-🔑 {prompts['key_points']}:
+🔑 {key_points}:
 • [Main argument or topic 1 with specific examples]
 • [Main argument or topic 2 with specific examples]
 • [Main argument or topic 3 with specific examples]
 • [Additional key points as needed]
 
-🔍 {prompts['in_detail']}:
+🔍 {in_detail}:
 👥 Characters: [Based on transcript, estimate people count and descriptions - e.g., "1 speaker (presenter)", "2 people in conversation", "multiple participants"]
 🪑 Objects: [List objects likely visible based on context - e.g., "microphone, camera equipment", "desk, computer", "presentation screen", "books, papers"]
 😊 Emotions: [Infer emotions from tone and content - e.g., "enthusiastic, informative", "calm, professional", "excited, engaging"]
 🏢 Environment: [Describe likely setting based on content - e.g., "indoor studio", "office environment", "outdoor location", "classroom setting"]
 👔 Clothing: [Infer appropriate attire based on context - e.g., "professional attire", "casual wear", "formal presentation clothing"]
 
-💡 {prompts['takeaways']}:
+💡 {takeaways}:
 • [Practical insight 1 and its significance]
 • [Practical insight 2 and its significance]
 • [Practical insight 3 and its significance]
 
-🔄 {prompts['context']}: [Broader context discussion and future implications]
+🔄 {context}: [Broader context discussion and future implications]
+
+Use the language: {target_language}"""
+
+def _split_summary_prompt(template: str) -> tuple:
+    """Split a prompt around its {text} and {target_language} slots so calls only concatenate"""
+    before_text, after_text = template.split('{text}')
+    between, after_language = after_text.split('{target_language}')
+    return before_text, between, after_language
+
+# Per-language summary prompts as constant fragments around the text and language
+SUMMARY_PROMPT_PARTS = {
+    language: _split_summary_prompt(
+        SUMMARY_PROMPT_TEMPLATE.format(**headings, text='{text}', target_language='{target_language}')
+    )
+    for language, headings in LANGUAGE_PROMPTS.items()
+}
+
+def create_summary_prompt(text: str, target_language: str) -> str:
+    """Create summary prompt for different languages with optional visual context"""
+    before_text, between, after_language = SUMMARY_PROMPT_PARTS.get(target_language, SUMMARY_PROMPT_PARTS['en'])
+    # One join sizes and copies the result once; chained + would copy the transcript at every step
+    return ''.join((before_text, text, between, target_language, after_language))
+
+# Heading the model puts before each part's summary in a batched chunk response
+CHUNK_SUMMARY_HEADING = re.compile(r'^[#*\s]*PART \d+ SUMMARY.*$', re.MULTILINE | re.IGNORECASE)
+
+def create_chunk_section_prompt(chunks: list, first_index: int, total: int, target_language: str) -> str:
+    """Create one prompt that summarizes several parts of a long transcript into mergeable sections"""
+    prompts = LANGUAGE_PROMPTS.get(target_language, LANGUAGE_PROMPTS['en'])
+    numbers = range(first_index + 1, first_index + len(chunks) + 1)
+    parts = '\n\n'.join(f'### PART {number}\n{chunk}' for number, chunk in zip(numbers, chunks))
+    title_line = f"For part 1 only, begin with: 🎯 {prompts['title']}: [Create a descriptive title based on the actual content]\n\n" if first_index == 0 else ''
+
+    return f"""You are an expert content summarizer. Below are parts {numbers[0]} to {numbers[-1]} of {total} of a video transcript, each under its own "### PART n" heading. Summarize each part separately. Do not include any meta-commentary, introductions, or instructions in your response - provide only the summary content.
+
+{parts}
+
+For each part, start with a "### PART n SUMMARY" heading and format that part's summary exactly as follows:
+
+{title_line}📝 {prompts['overview']}: [One sentence describing what this part of the video covers]
+
+🔑 {prompts['key_points']}:
+• [Main argument or topic with specific examples]
+• [Additional key points as needed]
+
+💡 {prompts['takeaways']}:
+• [Practical insight and its significance]
+• [Additional insights as needed]
 
 Use the language: {target_language}"""
 
- 
\ No newline at end of file
+def split_chunk_sections(text: str) -> list:
+    """Split a batched chunk response into one section text per part"""
+    return [section for section in CHUNK_SUMMARY_HEADING.split(text) if section.strip()]
+
+BULLET_PREFIXES = ('• ', '- ', '* ')
+
+def merge_chunk_sections(section_texts: list, target_language: str) -> str:
+    """Stitch per-chunk section summaries into one summary without another model call"""
+    prompts = LANGUAGE_PROMPTS.get(target_language, LANGUAGE_PROMPTS['en'])
+    title = ''
+    overview = []
+    bullets = {'key_points': [], 'takeaways': []}
+    seen_bullets = set()
+
+    for text in section_texts:
+        section = None
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            if line.startswith('🎯'):
+                title = title or line.split(':', 1)[-1].strip()
+                section = None
+            elif line.startswith('📝'):
+                section = 'overview'
+                first_sentence = line.split(':', 1)[1].strip() if ':' in line else ''
+                if first_sentence:
+                    overview.append(first_sentence)
+            elif line.startswith('🔑'):
+                section = 'key_points'
+            elif line.startswith('💡'):
+                section = 'takeaways'
+            elif section == 'overview':
+                overview.append(line)
+            elif section in bullets and line.startswith(BULLET_PREFIXES):
+                bullet = line[2:].strip()
+                # Overlapping chunks often repeat a point; keep the first occurrence
+                if bullet and bullet.lower() not in seen_bullets:
+                    seen_bullets.add(bullet.lower())
+                    bullets[section].append(bullet)
+
+    parts = []
+    if title:
+        parts.append(f"🎯 {prompts['title']}: {title}")
+    parts.append(f"📝 {prompts['overview']}: {' '.join(overview)}")
+    parts.append(f"🔑 {prompts['key_points']}:\n" + '\n'.join(f'• {bullet}' for bullet in bullets['key_points']))
+    parts.append(f"💡 {prompts['takeaways']}:\n" + '\n'.join(f'• {bullet}' for bullet in bullets['takeaways']))
+
+    return '\n\n'.join(parts)
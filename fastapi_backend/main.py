@@ -1,14 +1,13 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
 import uvicorn
-import os
-import json
 import asyncio
+import os
+import orjson
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -21,24 +20,27 @@ from api.process_s3_video import router as process_s3_video_router
 from api.upload import router as upload_router  
 from api.history import router as history_router
 from api.chat_router import router as chat_router
+from lib.supabase_client import close_supabase
+from lib.google_files import google_files_processor
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - LOG_LEVEL=WARNING in production skips formatting per-request info logs
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Video Summarizer API",
     description="FastAPI backend for YouTube video and direct video file summarization",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# CORS configuration - load from cors-config.json if available
+# CORS configuration - load from cors-config.json if available. Read once at import:
+# middleware can't be added after startup, and no requests are served yet
 try:
-    with open("cors-config.json", "r") as f:
-        cors_config = json.load(f)
-        allowed_origins = cors_config.get("allowed_origins", ["*"])
+    cors_config = orjson.loads(Path("cors-config.json").read_bytes())
+    allowed_origins = cors_config.get("allowed_origins", ["*"])
 except FileNotFoundError:
     allowed_origins = ["*"]
 
@@ -58,19 +60,42 @@ app.include_router(upload_router, prefix="/api")
 app.include_router(history_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 
+# Worker threads for blocking client libraries (PostgREST, YouTube transcripts, boto3)
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", 32))
+
+@app.on_event("startup")
+async def startup():
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    close_supabase()
+    await google_files_processor.close()
+
+# The root body never changes - serialize it once and reuse the same response
+ROOT_RESPONSE = Response(
+    content=orjson.dumps({"message": "Video Summarizer FastAPI Backend", "version": "1.0.0"}),
+    media_type="application/json"
+)
 
 @app.get("/")
 async def root():
-    return {"message": "Video Summarizer FastAPI Backend", "version": "1.0.0"}
+    return ROOT_RESPONSE
+
+# Health checks only look at the status code - answer with a fixed plain-text body
+HEALTH_RESPONSE = PlainTextResponse("ok", headers={"Cache-Control": "no-store"})
 
-@app.get("/health")
+@app.get("/health", response_class=PlainTextResponse)
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    return HEALTH_RESPONSE
 
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
-        reload=True
+        # The file watcher is for development only - opt in with UVICORN_RELOAD=1
+        reload=os.getenv("UVICORN_RELOAD", "0") == "1"
     ) 
\ No newline at end of file
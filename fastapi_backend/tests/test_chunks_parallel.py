@@ -0,0 +1,36 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from lib.gemini import CHUNKS_PER_REQUEST, summarize_chunk_batches, summary_model
+
+# Simulated Gemini latency per batch request
+REQUEST_SECONDS = 1.0
+BATCH_COUNT = 5
+
+
+async def slow_generate_content_async(prompt):
+    await asyncio.sleep(REQUEST_SECONDS)
+    return SimpleNamespace(text='PART 1 SUMMARY\n🎯 TITLE: Part\n\n📝 OVERVIEW:\nSomething happened.')
+
+
+class SummarizeChunkBatchesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_batches_run_concurrently(self):
+        chunks = [f'chunk {index}' for index in range(BATCH_COUNT * CHUNKS_PER_REQUEST)]
+
+        with mock.patch.object(summary_model, 'generate_content_async', side_effect=slow_generate_content_async) as generate:
+            started = time.perf_counter()
+            events = [event async for event in summarize_chunk_batches(summary_model, chunks, 'en', progress_start=60, progress_span=15)]
+            elapsed = time.perf_counter() - started
+
+        # Sequential awaiting would take BATCH_COUNT * REQUEST_SECONDS
+        self.assertLess(elapsed, REQUEST_SECONDS * 1.5)
+        self.assertEqual(generate.call_count, BATCH_COUNT)
+        self.assertEqual([event['type'] for event in events], ['progress'] * BATCH_COUNT + ['sections'])
+        self.assertEqual(events[-2]['progress'], 75)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import re
+import unittest
+
+from lib.text_utils import _PREFIX_SOURCES, clean_model_output, strip_first_line_meta_prefixes, strip_meta_prefixes
+
+
+def cascade_strip(text: str) -> str:
+    """Reference behaviour: every prefix pattern applied once, in order"""
+    for source in _PREFIX_SOURCES:
+        text = re.sub(source, '', text, flags=re.IGNORECASE)
+    return text.strip()
+
+
+# Fragments that trigger (and almost trigger) the prefix patterns, for random inputs
+FRAGMENTS = (
+    'Okay', 'Sure', 'Here is', "Here's", 'I will', "I'll", 'Let me', 'Certainly', 'Alright',
+    'Based on the video', 'According to', 'I understand', 'Now', 'First', "Let's", 'Nowhere',
+    'Here are', 'This is', 'Below is', 'As requested', 'summary', 'analysis', 'breakdown',
+    'Hier ist', 'Ich werde', 'Ich verstehe', 'Zusammenfassung', 'Jetzt', 'Laut', 'Folgendes',
+    'text', 'again', 'to run', 'nothing', 'cool', ', ', '. ', ': ', '! ', ' ', '\n',
+    '🎯 TITLE: a', '# Heading', '• point',
+)
+
+
+class StripMetaPrefixesTest(unittest.TestCase):
+    def test_matches_cascade_on_reported_inputs(self):
+        for text in (
+            'Nowhere to run, nothing',
+            'Sure, I will do it. Based on the video, this is cool.\n🎯 TITLE: a',
+            'I understand the task. I understand again. text',
+            "Okay, here's the summary: 🎯 TITLE: Video",
+            'Ich verstehe. Hier ist die Zusammenfassung: Inhalt',
+        ):
+            self.assertEqual(strip_meta_prefixes(text), cascade_strip(text), text)
+
+    def test_matches_cascade_on_random_inputs(self):
+        rng = random.Random(0)
+        for _ in range(20000):
+            text = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 8)))
+            self.assertEqual(strip_meta_prefixes(text), cascade_strip(text), repr(text))
+
+    def test_section_markers_are_kept(self):
+        text = '🎯 TITLE: Okay, this is fine.\n\n• Sure, a point'
+        self.assertEqual(strip_meta_prefixes(text), text)
+        self.assertEqual(clean_model_output(text), text)
+        self.assertEqual(strip_meta_prefixes('\n\n  ' + text), text)
+
+
+class StripFirstLineMetaPrefixesTest(unittest.TestCase):
+    def test_strips_english_preamble(self):
+        self.assertEqual(strip_first_line_meta_prefixes("Okay, here's the summary: 🎯 TITLE: Video"), '🎯 TITLE: Video')
+
+    def test_keeps_spoken_openings_across_lines(self):
+        for text in (
+            'Okay so today we look at\n[00:05] the results, which are good',
+            'Sure thing\n[00:02] Next: the plan',
+            'Laut dem Bericht, ist alles gut',
+        ):
+            self.assertEqual(strip_first_line_meta_prefixes(text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
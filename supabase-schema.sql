@@ -85,4 +85,26 @@ FOR ALL USING (true);
 ALTER TABLE summaries ADD COLUMN IF NOT EXISTS analysis JSONB;
 
 -- Create index for analysis column
-CREATE INDEX IF NOT EXISTS idx_summaries_analysis ON summaries USING GIN (analysis); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_summaries_analysis ON summaries USING GIN (analysis);
+
+-- Gemini context cache holding the video context for a conversation
+ALTER TABLE chat_conversations ADD COLUMN IF NOT EXISTS context_cache_name TEXT;
+
+-- Computed column so history pages can flag transcripts without transferring them
+CREATE OR REPLACE FUNCTION has_transcript(summaries)
+RETURNS BOOLEAN AS $$
+    SELECT $1.transcript IS NOT NULL AND $1.transcript <> '';
+$$ LANGUAGE sql STABLE;
+
+-- Composite indexes matching the chat queries (filter by parent, order by created_at)
+CREATE INDEX IF NOT EXISTS idx_chat_messages_conversation_id_created_at ON chat_messages(conversation_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_chat_conversations_summary_id_created_at ON chat_conversations(summary_id, created_at DESC);
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_chat_messages_conversation_id;
+DROP INDEX IF EXISTS idx_chat_conversations_summary_id;
+
+-- Compress long transcripts and summaries with lz4 instead of the default pglz (Postgres 14+).
+-- Applies to newly written values; existing rows keep their current compression until rewritten.
+ALTER TABLE summaries ALTER COLUMN transcript SET COMPRESSION lz4;
+ALTER TABLE summaries ALTER COLUMN summary SET COMPRESSION lz4;